@@ -1,9 +1,26 @@
 # Servicio de Citas Médicas
 
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import orjson
 import requests
-from flask import Blueprint, Flask, jsonify, request
+from cachetools import TTLCache
+from flask import (
+    Blueprint,
+    Flask,
+    Response,
+    jsonify,
+    request,
+    stream_with_context,
+)
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from flask_compress import Compress
 from flask_cors import CORS
 from flask_jwt_extended import (
     JWTManager,
@@ -11,24 +28,146 @@ from flask_jwt_extended import (
     jwt_required,
 )
 from flask_sqlalchemy import SQLAlchemy
+from requests.adapters import HTTPAdapter
+from sqlalchemy import event, insert, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from urllib3.util.retry import Retry
+
+
+class ORJSONProvider(JSONProvider):
+    """Proveedor JSON de Flask (jsonify, request.get_json) basado en orjson"""
+
+    OPCIONES = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj, default=DefaultJSONProvider.default, option=self.OPCIONES
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # orjson ya devuelve bytes: se evita el paso intermedio por str
+        obj = self._prepare_response_obj(args, kwargs)
+        cuerpo = orjson.dumps(
+            obj, default=DefaultJSONProvider.default, option=self.OPCIONES
+        )
+        return self._app.response_class(cuerpo, mimetype="application/json")
+
+
+class JWTManagerConCache(JWTManager):
+    """JWTManager que recuerda unos segundos los tokens ya verificados.
+
+    Un token repetido (el cliente envía el mismo en cada petición) se sirve
+    desde la caché sin volver a comprobar la firma HMAC ni decodificarlo.
+    Sobrescribe un método privado de Flask-JWT-Extended, por eso la versión
+    está fijada en requirements.txt.
+    """
+
+    def __init__(self, app=None, **kwargs):
+        self._tokens = TTLCache(maxsize=10_000, ttl=5)
+        self._tokens_lock = threading.Lock()
+        super().__init__(app, **kwargs)
+
+    def _decode_jwt_from_config(
+        self, encoded_token, csrf_value=None, allow_expired=False
+    ):
+        if csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(
+                encoded_token, csrf_value, allow_expired
+            )
+        with self._tokens_lock:
+            claims = self._tokens.get(encoded_token)
+        # Un token caducado dentro de la ventana de la caché se vuelve a
+        # decodificar para que se rechace como siempre
+        if claims is None or claims.get("exp", float("inf")) <= time.time():
+            claims = super()._decode_jwt_from_config(encoded_token)
+            with self._tokens_lock:
+                self._tokens[encoded_token] = claims
+        return claims
+
 
 # Configuración de la aplicación Flask
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
 # Configuración de la base de datos SQLite
 app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///appointment_service.db"
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+    # Una conexión por hilo de gunicorn (--threads 16) y margen para ráfagas
+    "pool_size": 16,
+    "max_overflow": 8,
+    "pool_pre_ping": True,
+    "pool_recycle": 3600,
+    # Permitir compartir conexiones entre hilos (gunicorn gthread) y esperar
+    # hasta 30 s por el bloqueo de escritura en lugar de fallar de inmediato
+    "connect_args": {"check_same_thread": False, "timeout": 30},
+}
 
 # Configuración de JWT
 app.config["JWT_SECRET_KEY"] = "clave-secreta-cambiar-en-produccion"
 
+# Compresión gzip de las respuestas JSON (listados, resultados de lotes)
+app.config["COMPRESS_MIMETYPES"] = ["application/json"]
+app.config["COMPRESS_ALGORITHM"] = "gzip"
+app.config["COMPRESS_MIN_SIZE"] = 500
+# GET /citas se envía en streaming y Flask-Compress no admite gzip en ese modo
+app.config["COMPRESS_ALGORITHM_STREAMING"] = "deflate"
+
 # URL del servicio de usuarios (para comunicación entre servicios)
 USER_SERVICE_URL = "http://user_service:8000"
+VERIFY_BATCH_URL = f"{USER_SERVICE_URL}/verify/batch"
+
+# Máximo de citas aceptadas por POST /citas/bulk
+MAX_ITEMS_LOTE = 1000
+# Tamaño máximo del cuerpo de una carga masiva una vez descomprimido
+MAX_BYTES_LOTE = 16 * 1024 * 1024
 
 # Inicialización de extensiones
-db = SQLAlchemy(app)
-jwt = JWTManager(app)
+# expire_on_commit=False: tras el commit las instancias conservan sus valores
+# (id incluido) y la respuesta se construye sin otro SELECT por objeto
+db = SQLAlchemy(app, session_options={"expire_on_commit": False})
+jwt = JWTManagerConCache(app)
 CORS(app)
+Compress(app)
+
+
+@event.listens_for(Engine, "connect")
+def configurar_sqlite(dbapi_connection, connection_record):
+    """Activa WAL y ajusta pragmas de SQLite en cada conexión nueva"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
+
+
+# Sesión HTTP compartida con el servicio de usuarios (reutiliza conexiones keep-alive)
+USER_SERVICE_POOL_SIZE = 64
+
+_user_svc = requests.Session()
+_user_svc.headers["Connection"] = "keep-alive"
+_user_svc.mount(
+    "http://",
+    HTTPAdapter(
+        pool_maxsize=USER_SERVICE_POOL_SIZE,
+        max_retries=Retry(total=2, backoff_factor=0.05),
+    ),
+)
+
+# Pool de hilos para lanzar en paralelo las verificaciones contra user_service
+_verify_executor = ThreadPoolExecutor(max_workers=8)
+
+# Caché de verificaciones positivas: (endpoint, hash del token) -> resultado
+_verify_cache = TTLCache(maxsize=10_000, ttl=30)
+_verify_cache_lock = threading.RLock()
 
 
 # ========================================
@@ -52,6 +191,60 @@ class Appointment(db.Model):
     id_centro = db.Column(db.Integer, nullable=False)
     id_usuario_registra = db.Column(db.Integer, nullable=False)
 
+    # Índices para la comprobación de conflictos y los filtros de listar_citas
+    __table_args__ = (
+        db.Index("ix_appt_doctor_fecha_estado", "id_doctor", "fecha", "estado"),
+        db.Index("ix_appt_fecha", "fecha"),
+        db.Index("ix_appt_centro", "id_centro"),
+        # Un doctor no puede tener dos citas PROGRAMADAS a la misma hora
+        db.Index(
+            "uq_doctor_fecha_programada",
+            "id_doctor",
+            "fecha",
+            unique=True,
+            sqlite_where=text("estado = 'PROGRAMADA'"),
+        ),
+    )
+
+
+# Campos de una cita que se devuelven en los listados (en orden de columna)
+CAMPOS_CITA = (
+    "id",
+    "fecha",
+    "motivo",
+    "estado",
+    "id_paciente",
+    "id_doctor",
+    "id_centro",
+)
+
+# Columnas y select() base de los listados: se construyen una sola vez, cada
+# filtro genera una copia y la SQL compilada la reutiliza la caché del engine
+COLUMNAS_CITA = tuple(getattr(Appointment, campo) for campo in CAMPOS_CITA)
+SELECT_CITAS = select(*COLUMNAS_CITA)
+
+
+# Campos obligatorios al crear una cita
+CAMPOS_REQUERIDOS = ("fecha", "motivo", "id_paciente", "id_doctor", "id_centro")
+
+# Campos de la cita que son ids de user_service
+CAMPOS_ID = ("id_paciente", "id_doctor", "id_centro")
+
+# Mensaje de error cuando el doctor ya tiene una cita a esa hora
+ERROR_CONFLICTO = "El doctor ya tiene una cita programada en esa fecha y hora"
+
+# Si el índice único uq_doctor_fecha_programada existe en la base de datos;
+# si no se pudo crear, crear_cita comprueba los conflictos con una consulta
+INDICE_CONFLICTOS = True
+
+
+# Verificaciones de una cita: (entidad, prefijo del endpoint, campo del payload)
+VERIFICACIONES_CITA = (
+    ("paciente", "/verify/pacientes/", "id_paciente"),
+    ("doctor", "/verify/doctores/", "id_doctor"),
+    ("centro", "/verify/centros/", "id_centro"),
+)
+
 
 # ========================================
 # BLUEPRINT: citas_bp (Gestión de Citas)
@@ -59,11 +252,26 @@ class Appointment(db.Model):
 citas_bp = Blueprint("citas_bp", __name__)
 
 
+@citas_bp.after_request
+def agregar_etag(respuesta):
+    """ETag débil (hash del cuerpo) en los GET; 304 si el cliente ya lo tiene
+
+    Se calcula sobre el JSON sin comprimir: Flask-Compress actúa después y no
+    modifica los ETag débiles.
+    """
+    if request.method != "GET" or respuesta.status_code != 200 or respuesta.is_streamed:
+        return respuesta
+    etag = hashlib.blake2b(respuesta.get_data(), digest_size=16).hexdigest()
+    respuesta.set_etag(etag, weak=True)
+    respuesta.headers["Cache-Control"] = "private, max-age=0, must-revalidate"
+    return respuesta.make_conditional(request)
+
+
 def verificar_usuario(token):
     """Verificar token con el servicio de usuarios"""
     try:
         headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(
+        response = _user_svc.get(
             f"{USER_SERVICE_URL}/verify/token", headers=headers, timeout=5
         )
         return response.status_code == 200
@@ -71,20 +279,290 @@ def verificar_usuario(token):
         return False
 
 
+def _clave_verificacion(endpoint, token):
+    """Clave de caché de una verificación (el token nunca se guarda en claro)"""
+    return endpoint, hashlib.sha256(token.encode()).digest()[:16]
+
+
+def _leer_verificacion(clave):
+    with _verify_cache_lock:
+        return _verify_cache.get(clave)
+
+
+def _guardar_verificacion(clave, resultado):
+    # Solo se cachean los resultados positivos, para no ocultar entidades
+    # recién creadas
+    if resultado[0]:
+        with _verify_cache_lock:
+            _verify_cache[clave] = resultado
+
+
 def verificar_existencia_user_service(endpoint, token):
     """Verificar que una entidad exista en el servicio de usuarios (reenviando JWT)
 
     Devuelve: (ok: bool, status_code: int | None, body: str | None)
     """
+    clave = _clave_verificacion(endpoint, token)
+    resultado = _leer_verificacion(clave)
+    if resultado is not None:
+        return resultado
+
     try:
         headers = {"Authorization": f"Bearer {token}"} if token else {}
-        response = requests.get(
+        response = _user_svc.get(
             f"{USER_SERVICE_URL}{endpoint}", headers=headers, timeout=5
         )
-        return response.status_code == 200, response.status_code, response.text
+        resultado = (
+            response.status_code == 200,
+            response.status_code,
+            response.text,
+        )
     except Exception as e:
         return False, None, str(e)
 
+    _guardar_verificacion(clave, resultado)
+    return resultado
+
+
+def verificar_lote_user_service(data, token):
+    """Verificar paciente, doctor y centro con una sola llamada a /verify/batch
+
+    Devuelve una lista [(entidad, (ok, status_code, body)), ...] en el orden de
+    VERIFICACIONES_CITA, o None si user_service no ofrece el endpoint por
+    lotes (versiones anteriores) y hay que verificar entidad por entidad.
+    """
+    resultados = {}
+    pendientes = {}
+    for entidad, prefijo, campo in VERIFICACIONES_CITA:
+        clave = _clave_verificacion(prefijo + str(data[campo]), token)
+        resultado = _leer_verificacion(clave)
+        if resultado is not None:
+            resultados[entidad] = resultado
+        else:
+            pendientes[entidad] = (clave, data[campo])
+
+    if pendientes:
+        try:
+            headers = {"Authorization": f"Bearer {token}"} if token else {}
+            response = _user_svc.post(
+                VERIFY_BATCH_URL,
+                json={entidad: id_ for entidad, (_, id_) in pendientes.items()},
+                headers=headers,
+                timeout=5,
+            )
+        except Exception as e:
+            for entidad in pendientes:
+                resultados[entidad] = (False, None, str(e))
+        else:
+            if response.status_code in (404, 405):
+                return None
+            if response.status_code != 200:
+                for entidad in pendientes:
+                    resultados[entidad] = (
+                        False,
+                        response.status_code,
+                        response.text,
+                    )
+            else:
+                lote = response.json().get("resultados", {})
+                for entidad, (clave, _) in pendientes.items():
+                    item = lote.get(entidad, {})
+                    existe = bool(item.get("exists"))
+                    resultado = (
+                        existe,
+                        200 if existe else 404,
+                        orjson.dumps(item).decode(),
+                    )
+                    _guardar_verificacion(clave, resultado)
+                    resultados[entidad] = resultado
+
+    return [(entidad, resultados[entidad]) for entidad, _, _ in VERIFICACIONES_CITA]
+
+
+def error_verificacion(entidad, resultado):
+    """(mensaje, código HTTP) de una verificación fallida, o None si existe"""
+    ok, status, _ = resultado
+    if ok:
+        return None
+    if status in (401, 403):
+        return f"No autorizado para verificar {entidad}", status
+    return f"El {entidad} no existe o está inactivo", 400
+
+
+def respuesta_error_verificacion(entidad, resultado):
+    """Construye la respuesta de error de una verificación fallida
+
+    Devuelve None si la entidad existe.
+    """
+    error = error_verificacion(entidad, resultado)
+    if error is None:
+        return None
+    mensaje, codigo = error
+    _, status, body = resultado
+    return (
+        jsonify(
+            {
+                "error": mensaje,
+                "user_service_status": status,
+                "user_service_body": body,
+            }
+        ),
+        codigo,
+    )
+
+
+def verificar_ids_user_service(ids, token):
+    """Verifica una sola vez cada id distinto de paciente, doctor y centro
+
+    ids: {entidad: conjunto de ids}. Los ids que no están en la caché se
+    envían juntos, como listas, en una sola llamada a /verify/batch; si
+    user_service no admite listas, se verifican id por id.
+    Devuelve {(entidad, id): (ok, status_code, body)}.
+    """
+    resultados = {}
+    pendientes = {}
+    for entidad, prefijo, _ in VERIFICACIONES_CITA:
+        for id_ in ids.get(entidad, ()):
+            endpoint = prefijo + str(id_)
+            resultado = _leer_verificacion(_clave_verificacion(endpoint, token))
+            if resultado is not None:
+                resultados[(entidad, id_)] = resultado
+            else:
+                pendientes[(entidad, id_)] = endpoint
+    if not pendientes:
+        return resultados
+
+    lote = {}
+    for entidad, id_ in pendientes:
+        lote.setdefault(entidad, []).append(id_)
+    try:
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        response = _user_svc.post(
+            VERIFY_BATCH_URL, json=lote, headers=headers, timeout=5
+        )
+    except Exception as e:
+        resultados.update((clave, (False, None, str(e))) for clave in pendientes)
+        return resultados
+
+    if response.status_code in (400, 404, 405):
+        # user_service anterior, sin /verify/batch o sin listas de ids
+        claves = list(pendientes)
+        verificaciones = _verify_executor.map(
+            lambda clave: verificar_existencia_user_service(pendientes[clave], token),
+            claves,
+        )
+        resultados.update(zip(claves, verificaciones))
+    elif response.status_code != 200:
+        resultado = (False, response.status_code, response.text)
+        resultados.update((clave, resultado) for clave in pendientes)
+    else:
+        respuesta = response.json().get("resultados", {})
+        for entidad, items in respuesta.items():
+            for item in items:
+                clave = (entidad, item.get("id"))
+                if clave not in pendientes:
+                    continue
+                existe = bool(item.get("exists"))
+                resultado = (
+                    existe,
+                    200 if existe else 404,
+                    orjson.dumps(item).decode(),
+                )
+                _guardar_verificacion(
+                    _clave_verificacion(pendientes[clave], token), resultado
+                )
+                resultados[clave] = resultado
+        # Un id que falte en la respuesta cuenta como no verificado
+        for clave in pendientes:
+            resultados.setdefault(clave, (False, response.status_code, response.text))
+    return resultados
+
+
+def verificar_cita(data, token):
+    """Verifica paciente, doctor y centro de una cita
+
+    Usa /verify/batch y, si user_service no lo ofrece, verifica entidad por
+    entidad en paralelo.
+    Devuelve [(entidad, (ok, status_code, body)), ...].
+    """
+    resultados = verificar_lote_user_service(data, token)
+    if resultados is not None:
+        return resultados
+    futuros = [
+        (
+            entidad,
+            _verify_executor.submit(
+                verificar_existencia_user_service,
+                prefijo + str(data[campo]),
+                token,
+            ),
+        )
+        for entidad, prefijo, campo in VERIFICACIONES_CITA
+    ]
+    return [(entidad, futuro.result()) for entidad, futuro in futuros]
+
+
+def leer_json_lote():
+    """Cuerpo JSON de una carga masiva; admite Content-Encoding: gzip.
+
+    Retorna None si el cuerpo no es JSON válido o si descomprimido supera
+    MAX_BYTES_LOTE.
+    """
+    if request.headers.get("Content-Encoding", "").lower() != "gzip":
+        return request.get_json(silent=True)
+    try:
+        descompresor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        cuerpo = descompresor.decompress(request.get_data(), MAX_BYTES_LOTE)
+        if descompresor.unconsumed_tail:
+            return None
+        return orjson.loads(cuerpo)
+    except (zlib.error, orjson.JSONDecodeError):
+        return None
+
+
+def parsear_fecha(valor):
+    """Convierte una fecha ISO 8601 a datetime sin zona horaria
+
+    datetime.fromisoformat está implementado en C y desde Python 3.11 acepta
+    el sufijo "Z" directamente, sin necesidad de reemplazarlo. La columna
+    guarda la hora local indicada sin la zona, así que la zona se descarta
+    (sin convertir) para comparar con las fechas ya guardadas.
+    """
+    return datetime.fromisoformat(valor).replace(tzinfo=None)
+
+
+def validar_cita(data):
+    """Valida los datos de una cita y los prepara para insertarla
+
+    Retorna (valores, None), con la fecha como datetime y los ids como int,
+    o (None, mensaje de error).
+    """
+    if not isinstance(data, dict) or any(
+        data.get(k) is None for k in CAMPOS_REQUERIDOS
+    ):
+        return None, "Faltan datos requeridos"
+    if not isinstance(data["motivo"], str):
+        return None, "El campo 'motivo' debe ser texto"
+    valores = {"motivo": data["motivo"]}
+    for campo in CAMPOS_ID:
+        # type() y no isinstance(): bool es subclase de int
+        if type(data[campo]) is not int:
+            return None, f"El campo '{campo}' debe ser un entero"
+        valores[campo] = data[campo]
+    try:
+        valores["fecha"] = parsear_fecha(data["fecha"])
+    except (TypeError, ValueError):
+        return None, "Formato de fecha inválido"
+    return valores, None
+
+
+def es_conflicto_agenda(error):
+    """True si el IntegrityError lo provoca el índice uq_doctor_fecha_programada"""
+    tabla = Appointment.__tablename__
+    return f"UNIQUE constraint failed: {tabla}.id_doctor, {tabla}.fecha" in str(
+        error.orig
+    )
+
 
 @citas_bp.route("/citas", methods=["POST"])
 @jwt_required()
@@ -92,145 +570,174 @@ def crear_cita():
     """Crear una nueva cita médica"""
     usuario_id = get_jwt_identity()
 
-    data = request.get_json()
+    # Validación de datos requeridos, tipos y fecha
+    data, error = validar_cita(request.get_json())
+    if error:
+        return jsonify({"error": error}), 400
 
-    # Validación básica de datos requeridos
-    if not data or not all(
-        k in data for k in ["fecha", "motivo", "id_paciente", "id_doctor", "id_centro"]
+    # Reenviar token al user_service para endpoints de verificación
+    # (@jwt_required ya validó que la cabecera tiene la forma "Bearer <token>")
+    auth = request.headers.get("Authorization", "")
+    token = auth[7:] if auth.startswith("Bearer ") else ""
+
+    # Verificar paciente, doctor y centro en una sola llamada a user_service
+    resultados = verificar_cita(data, token)
+
+    # Se revisan en orden para devolver siempre el primer error
+    for entidad, resultado in resultados:
+        error = respuesta_error_verificacion(entidad, resultado)
+        if error:
+            return error
+
+    # Sin el índice único (base de datos con duplicados previos) se comprueba
+    # el conflicto con una consulta
+    if not INDICE_CONFLICTOS and db.session.scalar(
+        select(Appointment.id).where(
+            Appointment.id_doctor == data["id_doctor"],
+            Appointment.fecha == data["fecha"],
+            Appointment.estado == "PROGRAMADA",
+        )
     ):
-        return jsonify({"error": "Faltan datos requeridos"}), 400
+        return jsonify({"error": ERROR_CONFLICTO}), 400
+
+    # Crear nueva cita con un único INSERT ... RETURNING (sin unit of work)
+    stmt = (
+        insert(Appointment)
+        .values(**data, id_usuario_registra=usuario_id)
+        .returning(*COLUMNAS_CITA)
+    )
 
+    # El índice único parcial rechaza otra cita del doctor en la misma fecha y hora
     try:
-        # Convertir la fecha a formato datetime
-        fecha_dt = datetime.fromisoformat(data["fecha"].replace("Z", "+00:00"))
-    except:
-        return jsonify({"error": "Formato de fecha inválido"}), 400
+        cita = dict(zip(CAMPOS_CITA, db.session.execute(stmt).one()))
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if not es_conflicto_agenda(e):
+            raise
+        return jsonify({"error": ERROR_CONFLICTO}), 400
 
-    # Reenviar token al user_service para endpoints de verificación
-    auth = request.headers.get("Authorization", "")
-    token = auth.split(" ", 1)[1].strip() if auth.lower().startswith("bearer ") else ""
+    cita["fecha"] = cita["fecha"].isoformat()
+    return jsonify({"mensaje": "Cita creada exitosamente", "cita": cita}), 201
 
-    # Verificar que el paciente exista
-    ok, status, body = verificar_existencia_user_service(
-        f"/verify/pacientes/{data['id_paciente']}", token
-    )
-    if not ok:
-        if status in (401, 403):
-            return (
-                jsonify(
-                    {
-                        "error": "No autorizado para verificar paciente",
-                        "user_service_status": status,
-                        "user_service_body": body,
-                    }
-                ),
-                status,
-            )
-        return (
-            jsonify(
-                {
-                    "error": "El paciente no existe o está inactivo",
-                    "user_service_status": status,
-                    "user_service_body": body,
-                }
-            ),
-            400,
-        )
 
-    # Verificar que el doctor exista
-    ok, status, body = verificar_existencia_user_service(
-        f"/verify/doctores/{data['id_doctor']}", token
-    )
-    if not ok:
-        if status in (401, 403):
-            return (
-                jsonify(
-                    {
-                        "error": "No autorizado para verificar doctor",
-                        "user_service_status": status,
-                        "user_service_body": body,
-                    }
-                ),
-                status,
-            )
+@citas_bp.route("/citas/bulk", methods=["POST"])
+@jwt_required()
+def crear_citas_lote():
+    """Crear varias citas con un único INSERT multi-fila
+
+    Recibe {"items": [...]} (hasta MAX_ITEMS_LOTE) y devuelve un resultado
+    por cita, en el mismo orden.
+    """
+    usuario_id = get_jwt_identity()
+
+    data = leer_json_lote()
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list) or len(items) > MAX_ITEMS_LOTE:
         return (
             jsonify(
-                {
-                    "error": "El doctor no existe o está inactivo",
-                    "user_service_status": status,
-                    "user_service_body": body,
-                }
+                {"error": f"Se esperaba 'items' con hasta {MAX_ITEMS_LOTE} elementos"}
             ),
             400,
         )
 
-    # Verificar que el centro exista
-    ok, status, body = verificar_existencia_user_service(
-        f"/verify/centros/{data['id_centro']}", token
+    auth = request.headers.get("Authorization", "")
+    token = auth[7:] if auth.startswith("Bearer ") else ""
+
+    # Validación de datos requeridos, tipos y fechas
+    valores = [None] * len(items)
+    errores = [None] * len(items)
+    for i, item in enumerate(items):
+        valores[i], errores[i] = validar_cita(item)
+
+    # Verificación de entidades: cada paciente/doctor/centro distinto del
+    # lote se comprueba una sola vez y el resultado se aplica a sus citas
+    pendientes = [i for i, error in enumerate(errores) if error is None]
+    verificados = verificar_ids_user_service(
+        {
+            entidad: {valores[i][campo] for i in pendientes}
+            for entidad, _, campo in VERIFICACIONES_CITA
+        },
+        token,
     )
-    if not ok:
-        if status in (401, 403):
-            return (
-                jsonify(
-                    {
-                        "error": "No autorizado para verificar centro",
-                        "user_service_status": status,
-                        "user_service_body": body,
-                    }
-                ),
-                status,
+    for i in pendientes:
+        for entidad, _, campo in VERIFICACIONES_CITA:
+            error = error_verificacion(
+                entidad, verificados[(entidad, valores[i][campo])]
             )
-        return (
-            jsonify(
-                {
-                    "error": "El centro no existe o está inactivo",
-                    "user_service_status": status,
-                    "user_service_body": body,
-                }
-            ),
-            400,
+            if error:
+                errores[i] = error[0]
+                break
+
+    # Conflictos de agenda: una consulta para las citas ya programadas y un
+    # conjunto para las del propio lote
+    candidatas = [i for i, error in enumerate(errores) if error is None]
+    ocupadas = set()
+    if candidatas:
+        ocupadas.update(
+            db.session.execute(
+                select(Appointment.id_doctor, Appointment.fecha).where(
+                    Appointment.estado == "PROGRAMADA",
+                    Appointment.id_doctor.in_(
+                        {valores[i]["id_doctor"] for i in candidatas}
+                    ),
+                    Appointment.fecha.in_({valores[i]["fecha"] for i in candidatas}),
+                )
+            ).tuples()
         )
-
-    # Verificar que no haya otra cita del doctor en la misma fecha y hora
-    cita_conflicto = Appointment.query.filter_by(
-        id_doctor=data["id_doctor"],
-        fecha=fecha_dt,
-        estado="PROGRAMADA",
-    ).first()
-
-    if cita_conflicto:
-        return jsonify(
-            {"error": "El doctor ya tiene una cita programada en esa fecha y hora"}
-        ), 400
-
-    # Crear nueva cita
-    nueva_cita = Appointment(
-        fecha=fecha_dt,
-        motivo=data["motivo"],
-        id_paciente=data["id_paciente"],
-        id_doctor=data["id_doctor"],
-        id_centro=data["id_centro"],
-        id_usuario_registra=usuario_id,
+    insertar = []
+    filas = []
+    for i in candidatas:
+        clave = (valores[i]["id_doctor"], valores[i]["fecha"])
+        if clave in ocupadas:
+            errores[i] = ERROR_CONFLICTO
+            continue
+        ocupadas.add(clave)
+        insertar.append(i)
+        filas.append(dict(valores[i], id_usuario_registra=usuario_id))
+
+    # Un único INSERT multi-fila (insertmanyvalues) con RETURNING en el orden
+    # de los parámetros
+    creadas = {}
+    if filas:
+        stmt = insert(Appointment).returning(
+            *COLUMNAS_CITA, sort_by_parameter_order=True
+        )
+        try:
+            filas_creadas = list(zip(insertar, db.session.execute(stmt, filas)))
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not es_conflicto_agenda(e):
+                raise
+            # Otra petición ocupó algún hueco tras la comprobación: se repite
+            # cita por cita (cada una en un SAVEPOINT) y solo fallan esas
+            filas_creadas = []
+            for i, fila in zip(insertar, filas):
+                try:
+                    with db.session.begin_nested():
+                        filas_creadas.append(
+                            (i, db.session.execute(stmt, [fila]).one())
+                        )
+                except IntegrityError as e:
+                    if not es_conflicto_agenda(e):
+                        raise
+                    errores[i] = ERROR_CONFLICTO
+            db.session.commit()
+        for i, fila in filas_creadas:
+            cita = dict(zip(CAMPOS_CITA, fila))
+            cita["fecha"] = cita["fecha"].isoformat()
+            creadas[i] = cita
+
+    resultados = [
+        {"cita": creadas[i]} if i in creadas else {"error": errores[i]}
+        for i in range(len(items))
+    ]
+    return (
+        jsonify({"creados": len(creadas), "resultados": resultados}),
+        201 if creadas else 400,
     )
 
-    db.session.add(nueva_cita)
-    db.session.commit()
-
-    return jsonify(
-        {
-            "mensaje": "Cita creada exitosamente",
-            "cita": {
-                "id": nueva_cita.id,
-                "fecha": nueva_cita.fecha.isoformat(),
-                "motivo": nueva_cita.motivo,
-                "estado": nueva_cita.estado,
-                "id_paciente": nueva_cita.id_paciente,
-                "id_doctor": nueva_cita.id_doctor,
-                "id_centro": nueva_cita.id_centro,
-            },
-        }
-    ), 201
-
 
 @citas_bp.route("/citas", methods=["GET"])
 @jwt_required()
@@ -244,47 +751,57 @@ def listar_citas():
     id_doctor = request.args.get("id_doctor", type=int)
     id_centro = request.args.get("id_centro", type=int)
     estado = request.args.get("estado")
+    limit = request.args.get("limit", default=200, type=int)
+    limit = min(max(limit, 1), 1000)
+    offset = max(request.args.get("offset", default=0, type=int), 0)
 
-    # Construir consulta base
-    query = Appointment.query
+    # Consulta base precalculada (solo las columnas necesarias, sin objetos ORM)
+    stmt = SELECT_CITAS
 
     # Aplicar filtros si se proporcionan
-    if fecha_inicio:
-        query = query.filter(Appointment.fecha >= datetime.fromisoformat(fecha_inicio))
-    if fecha_fin:
-        query = query.filter(Appointment.fecha <= datetime.fromisoformat(fecha_fin))
+    try:
+        inicio = parsear_fecha(fecha_inicio) if fecha_inicio else None
+        fin = parsear_fecha(fecha_fin) if fecha_fin else None
+    except ValueError:
+        return jsonify({"error": "Formato de fecha inválido"}), 400
+    if inicio and fin:
+        stmt = stmt.where(Appointment.fecha.between(inicio, fin))
+    elif inicio:
+        stmt = stmt.where(Appointment.fecha >= inicio)
+    elif fin:
+        stmt = stmt.where(Appointment.fecha <= fin)
     if id_doctor:
-        query = query.filter_by(id_doctor=id_doctor)
+        stmt = stmt.where(Appointment.id_doctor == id_doctor)
     if id_centro:
-        query = query.filter_by(id_centro=id_centro)
+        stmt = stmt.where(Appointment.id_centro == id_centro)
     if estado:
-        query = query.filter_by(estado=estado)
+        stmt = stmt.where(Appointment.estado == estado)
 
-    citas = query.all()
+    # Orden por fecha (aprovecha los índices) y tamaño de página acotado
+    stmt = stmt.order_by(Appointment.fecha, Appointment.id).limit(limit).offset(offset)
 
-    return jsonify(
-        {
-            "citas": [
-                {
-                    "id": c.id,
-                    "fecha": c.fecha.isoformat(),
-                    "motivo": c.motivo,
-                    "estado": c.estado,
-                    "id_paciente": c.id_paciente,
-                    "id_doctor": c.id_doctor,
-                    "id_centro": c.id_centro,
-                }
-                for c in citas
-            ]
-        }
-    ), 200
+    # Recorrer el resultado por lotes para no cargar toda la tabla en memoria
+    rows = db.session.execute(stmt.execution_options(yield_per=1000))
+
+    def generar():
+        # orjson serializa datetime de forma nativa (sin llamar a isoformat)
+        yield b'{"citas":['
+        separador = b""
+        for r in rows:
+            yield separador + orjson.dumps(dict(zip(CAMPOS_CITA, r)))
+            separador = b","
+        yield b"]}"
+
+    return Response(
+        stream_with_context(generar()), status=200, mimetype="application/json"
+    )
 
 
 @citas_bp.route("/citas/<int:cita_id>", methods=["GET"])
 @jwt_required()
 def obtener_cita(cita_id):
     """Obtener una cita específica por ID"""
-    cita = Appointment.query.get(cita_id)
+    cita = db.session.get(Appointment, cita_id)
 
     if not cita:
         return jsonify({"error": "Cita no encontrada"}), 404
@@ -308,7 +825,7 @@ def obtener_cita(cita_id):
 @jwt_required()
 def cancelar_cita(cita_id):
     """Cancelar una cita existente"""
-    cita = Appointment.query.get(cita_id)
+    cita = db.session.get(Appointment, cita_id)
 
     if not cita:
         return jsonify({"error": "Cita no encontrada"}), 404
@@ -339,24 +856,29 @@ def cancelar_cita(cita_id):
 # ========================================
 
 
+# Cuerpos constantes serializados una sola vez al importar el módulo
+_HEALTH_BODY = orjson.dumps(
+    {"service": "appointment_service", "status": "ok", "environment": "development"}
+)
+_ROOT_BODY = orjson.dumps(
+    {
+        "name": "OdontoCare - Servicio de Gestión de Citas",
+        "version": "1.0.0",
+        "endpoints": {"citas": "/citas", "health": "/health"},
+    }
+)
+
+
 @app.route("/health")
 def health():
     """Endpoint de verificación de salud del servicio"""
-    return jsonify(
-        {"service": "appointment_service", "status": "ok", "environment": "development"}
-    ), 200
+    return Response(_HEALTH_BODY, status=200, mimetype="application/json")
 
 
 @app.route("/")
 def root():
     """Endpoint raíz con información del servicio"""
-    return jsonify(
-        {
-            "name": "OdontoCare - Servicio de Gestión de Citas",
-            "version": "1.0.0",
-            "endpoints": {"citas": "/citas", "health": "/health"},
-        }
-    ), 200
+    return Response(_ROOT_BODY, status=200, mimetype="application/json")
 
 
 # ========================================
@@ -369,6 +891,19 @@ app.register_blueprint(citas_bp)
 # Crear tablas de la base de datos
 with app.app_context():
     db.create_all()
-
+    # create_all solo crea los índices junto con la tabla: en una base de datos
+    # anterior a ellos se añaden aquí
+    for indice in Appointment.__table__.indexes:
+        try:
+            indice.create(db.engine, checkfirst=True)
+        except IntegrityError:
+            # Hay citas PROGRAMADAS duplicadas de antes del índice único
+            app.logger.warning("No se pudo crear el índice %s", indice.name)
+            INDICE_CONFLICTOS = False
+    # Cerrar las conexiones abiertas antes de que gunicorn haga fork (--preload)
+    db.engine.dispose()
+
+# Solo para desarrollo local; en Docker se sirve con gunicorn (ver Dockerfile).
+# El modo debug se activa con FLASK_DEBUG=1.
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8001, debug=True)
+    app.run(host="0.0.0.0", port=8001)
@@ -16,19 +16,45 @@ Características:
 """
 
 import argparse
-import csv
-import getpass
+import gzip
 import json
 import os
+import re
 import sys
-
-import requests
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice, zip_longest
+from types import SimpleNamespace
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa el módulo json
+    orjson = None
 
 # Configuración por defecto
 DEFAULT_USER_SERVICE_URL = "http://localhost:8000"
 DEFAULT_APPOINTMENT_SERVICE_URL = "http://localhost:8001"
 DEFAULT_TIMEOUT = 10
 DEFAULT_TEMPLATES_DIR = "csv_templates"
+DEFAULT_BULK_CHUNK = 500  # Filas por petición a los endpoints /bulk
+DEFAULT_USER_BULK_CHUNK = 100  # Máximo que acepta /auth/register/bulk
+DEFAULT_BULK_TIMEOUT = 120  # Un lote puede tardar bastante más que una fila
+DEFAULT_PAGE_SIZE = 100  # Máximo per_page que acepta user_service
+DEFAULT_APPOINTMENT_PAGE_SIZE = 1000  # Máximo limit que acepta GET /citas
+
+# Con --verbose (o ODONTO_VERBOSE=1) la carga masiva muestra payload y
+# respuesta de cada fila; por defecto solo se muestran los errores y el progreso
+VERBOSE = os.environ.get("ODONTO_VERBOSE", "0") == "1"
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+GZIP_JSON_HEADERS = {**JSON_HEADERS, "Content-Encoding": "gzip"}
+GZIP_MIN_BYTES = 1024  # Por debajo de este tamaño no compensa comprimir
+_INT_RE = re.compile(r"-?\d+")
+DEFAULT_POOL_SIZE = 32  # Conexiones keep-alive por servicio
+CACHE_TTL = 60  # Segundos de vida de las lecturas de doctores/centros
+CACHE_MAXSIZE = 512  # Entradas máximas en la caché de lecturas
 
 
 # ---------- Colores ANSI para la terminal ----------
@@ -37,7 +63,6 @@ class Colors:
     """Clase para manejar colores ANSI en la terminal"""
     RESET = "[0m"
     BOLD = "[1m"
-    DIM = "[2m"
 
     # Colores de texto - Paleta minimalista profesional
     BLUE = "[34m"
@@ -56,249 +81,480 @@ class Colors:
     DIM = GRAY
 
 
+# Marcos de encabezados y secciones, construidos una sola vez
+_HEADER_WIDTH = 70
+_FRAME = Colors.BLUE + Colors.BOLD
+_HEADER_TOP = f"{_FRAME}╔{'═' * (_HEADER_WIDTH - 2)}╗{Colors.RESET}"
+_HEADER_BOTTOM = f"{_FRAME}╚{'═' * (_HEADER_WIDTH - 2)}╝{Colors.RESET}"
+_HEADER_SIDE = f"{_FRAME}║{Colors.RESET}"
+_SECTION_RULE = f"{_FRAME}{'─' * 63}{Colors.RESET}"
+
+
 def print_header(text):
     """Imprime un encabezado decorado"""
-    width = 70
-    padding = (width - len(text) - 2) // 2
-    print(Colors.BLUE + Colors.BOLD + "╔" + "═" * (width - 2) + "╗" + Colors.RESET)
-    print(
-        Colors.BLUE
-        + Colors.BOLD
-        + "║"
-        + Colors.RESET
-        + " " * padding
-        + Colors.HEADER
-        + text
-        + Colors.RESET
-        + " " * (width - 2 - padding - len(text))
-        + Colors.BLUE
-        + Colors.BOLD
-        + "║"
-        + Colors.RESET
+    padding = (_HEADER_WIDTH - len(text) - 2) // 2
+    rest = _HEADER_WIDTH - 2 - padding - len(text)
+    sys.stdout.write(
+        f"{_HEADER_TOP}\n"
+        f"{_HEADER_SIDE}{' ' * padding}{Colors.HEADER}{text}{Colors.RESET}"
+        f"{' ' * rest}{_HEADER_SIDE}\n"
+        f"{_HEADER_BOTTOM}\n"
     )
-    print(Colors.BLUE + Colors.BOLD + "╚" + "═" * (width - 2) + "╝" + Colors.RESET)
 
 
 def print_section(title):
     """Imprime un separador de sección"""
-    print(f"\n{Colors.BLUE + Colors.BOLD}───────────────────────────────────────────────────────────────{Colors.RESET}")
-    print(f"{Colors.BLUE + Colors.BOLD}  {title}{Colors.RESET}")
-    print(f"{Colors.BLUE + Colors.BOLD}───────────────────────────────────────────────────────────────{Colors.RESET}")
+    sys.stdout.write(
+        f"\n{_SECTION_RULE}\n{_FRAME}  {title}{Colors.RESET}\n{_SECTION_RULE}\n"
+    )
+
+
+# Formatos de las líneas de mensajes, con los colores ya resueltos
+_ITEM_FMT = f"  {Colors.BLUE}{{}}){Colors.RESET} {{}}"
+_SUCCESS_FMT = f"{Colors.GREEN}OK: {{}}{Colors.RESET}"
+_ERROR_FMT = f"{Colors.YELLOW}Error: {{}}{Colors.RESET}"
+_INFO_FMT = f"{Colors.BLUE}Info: {{}}{Colors.RESET}"
+_WARNING_FMT = f"{Colors.YELLOW}Advertencia: {{}}{Colors.RESET}"
+_PROMPT_FMT = f"{Colors.BLUE}► {{}}{Colors.RESET}"
 
 
 def print_item(number, text):
     """Imprime una opción de menú"""
-    print(f"  {Colors.BLUE}{number}){Colors.RESET} {text}")
+    print(_ITEM_FMT.format(number, text))
 
 
 def print_success(text):
     """Imprime un mensaje de éxito"""
-    print(f"{Colors.GREEN}OK: {text}{Colors.RESET}")
+    print(_SUCCESS_FMT.format(text))
 
 
 def print_error(text):
     """Imprime un mensaje de error"""
-    print(f"{Colors.YELLOW}Error: {text}{Colors.RESET}")
+    print(_ERROR_FMT.format(text))
 
 
 def print_info(text):
     """Imprime un mensaje de información"""
-    print(f"{Colors.BLUE}Info: {text}{Colors.RESET}")
+    print(_INFO_FMT.format(text))
 
 
 def print_warning(text):
     """Imprime un mensaje de advertencia"""
-    print(f"{Colors.YELLOW}Advertencia: {text}{Colors.RESET}")
+    print(_WARNING_FMT.format(text))
 
 
 def print_prompt(text):
     """Imprime un prompt para el usuario"""
-    print(f"{Colors.BLUE}► {text}{Colors.RESET}", end="")
+    print(_PROMPT_FMT.format(text), end="")
 
 
 # ---------- Cliente REST Simple ----------
 
 
+def _encode_json(data):
+    """Codifica data como cuerpo JSON en bytes (con orjson si está)"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode()
+
+
+def _decode_json(response):
+    """Decodifica el cuerpo JSON de una respuesta (con orjson si está)"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
 class RestClient:
     """Cliente REST simple para interactuar con los servicios"""
 
     def __init__(self, user_service_url, appointment_service_url):
         self.user_service_url = user_service_url
         self.appointment_service_url = appointment_service_url
+        # URLs de los endpoints precalculadas una sola vez
+        self._ep = SimpleNamespace(
+            login=f"{user_service_url}/auth/login",
+            register=f"{user_service_url}/auth/register",
+            register_bulk=f"{user_service_url}/auth/register/bulk",
+            verify_token=f"{user_service_url}/verify/token",
+            patients=f"{user_service_url}/admin/pacientes",
+            patients_bulk=f"{user_service_url}/admin/pacientes/bulk",
+            patient=f"{user_service_url}/admin/pacientes/%s",
+            doctors=f"{user_service_url}/admin/doctores",
+            doctors_bulk=f"{user_service_url}/admin/doctores/bulk",
+            doctor=f"{user_service_url}/admin/doctores/%s",
+            centers=f"{user_service_url}/admin/centros",
+            centers_bulk=f"{user_service_url}/admin/centros/bulk",
+            center=f"{user_service_url}/admin/centros/%s",
+            appointments=f"{appointment_service_url}/citas",
+            appointments_bulk=f"{appointment_service_url}/citas/bulk",
+            appointment=f"{appointment_service_url}/citas/%s",
+        )
+        # requests (urllib3, ssl...) se importa aquí y no al cargar el módulo,
+        # para que `--help` y el arranque del CLI no paguen su coste
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
         self.session = requests.Session()
+        # Un pool de conexiones keep-alive por servicio, con reintentos ante
+        # errores transitorios. POST no se reintenta por estado HTTP para no
+        # duplicar altas (los fallos de conexión sí se reintentan).
+        retries = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=frozenset(["GET", "PUT", "DELETE"]),
+            raise_on_status=False,
+        )
+        for base_url in (user_service_url, appointment_service_url):
+            self.session.mount(
+                base_url,
+                HTTPAdapter(
+                    pool_connections=2,
+                    pool_maxsize=DEFAULT_POOL_SIZE,
+                    max_retries=retries,
+                ),
+            )
+        self.session.headers.update(
+            {"Accept": "application/json", "Connection": "keep-alive"}
+        )
         self._token = None
+        # Caché LRU con TTL para lecturas de doctores y centros
+        self._cache = OrderedDict()
+        # Últimos ETag y cuerpo recibidos por URL, para GET condicionales
+        self._etags = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    # ---------- Envío de JSON ----------
+
+    def _send_json(self, method, url, data, bulk=False):
+        """Envía data como cuerpo JSON, codificado con orjson si está
+
+        Con bulk=True (endpoints /bulk) los cuerpos grandes se comprimen con
+        gzip y se espera hasta DEFAULT_BULK_TIMEOUT.
+        """
+        body = _encode_json(data)
+        headers = JSON_HEADERS
+        if bulk and len(body) >= GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=1)
+            headers = GZIP_JSON_HEADERS
+        return self.session.request(
+            method,
+            url,
+            data=body,
+            headers=headers,
+            timeout=DEFAULT_BULK_TIMEOUT if bulk else DEFAULT_TIMEOUT,
+        )
+
+    def _post_json(self, url, data, bulk=False):
+        """POST con cuerpo JSON"""
+        return self._send_json("POST", url, data, bulk)
+
+    def _put_json(self, url, data):
+        """PUT con cuerpo JSON"""
+        return self._send_json("PUT", url, data)
+
+    # ---------- Caché ----------
+
+    def _cached_get(self, group, url, params=None):
+        """GET con caché TTL en memoria; solo se guardan respuestas 200"""
+        key = (group, url, tuple(sorted((params or {}).items())))
+        now = time.monotonic()
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(key)
+                return entry[1]
+        status, data = self._conditional_get(url, params)
+        if status == 200:
+            with self._cache_lock:
+                self._cache[key] = (now + CACHE_TTL, data)
+                self._cache.move_to_end(key)
+                while len(self._cache) > CACHE_MAXSIZE:
+                    self._cache.popitem(last=False)
+        return data
+
+    def _conditional_get(self, url, params=None):
+        """GET con If-None-Match si ya se tiene un ETag de esa URL
+
+        Ante un 304 se devuelve el cuerpo guardado sin descargarlo de nuevo.
+        Retorna (status, datos), con el 304 reportado como 200.
+        """
+        key = (url, tuple(sorted((params or {}).items())))
+        with self._cache_lock:
+            cached = self._etags.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else None
+        response = self.session.get(
+            url, params=params, headers=headers, timeout=DEFAULT_TIMEOUT
+        )
+        if response.status_code == 304 and cached:
+            return 200, cached[1]
+
+        data = _decode_json(response)
+        etag = response.headers.get("ETag")
+        with self._cache_lock:
+            if response.status_code == 200 and etag:
+                self._etags[key] = (etag, data)
+                self._etags.move_to_end(key)
+                while len(self._etags) > CACHE_MAXSIZE:
+                    self._etags.popitem(last=False)
+            else:
+                self._etags.pop(key, None)
+        return response.status_code, data
+
+    def _invalidate_cache(self, group=None):
+        """Descarta las entradas de un grupo (o toda la caché)"""
+        with self._cache_lock:
+            if group is None:
+                self._cache.clear()
+                self._etags.clear()
+                return
+            for key in [k for k in self._cache if k[0] == group]:
+                del self._cache[key]
 
     # ---------- Auth ----------
 
     def login(self, username, password):
         """POST /auth/login"""
-        url = f"{self.user_service_url}/auth/login"
+        url = self._ep.login
         data = {"username": username, "password": password}
-        response = self.session.post(url, json=data, timeout=DEFAULT_TIMEOUT)
+        response = self._post_json(url, data)
         self._token = response.json().get("access_token")
+        # El token queda en la sesión y se envía en todas las peticiones
+        if self._token:
+            self.session.headers["Authorization"] = f"Bearer {self._token}"
+        else:
+            self.session.headers.pop("Authorization", None)
+        self._invalidate_cache()
         return response.json()
 
+    def logout(self):
+        """Descarta el token actual"""
+        self._token = None
+        self.session.headers.pop("Authorization", None)
+        self._invalidate_cache()
+
     def register_user(self, data):
         """POST /auth/register"""
-        url = f"{self.user_service_url}/auth/register"
-        response = self.session.post(url, json=data, timeout=DEFAULT_TIMEOUT)
+        url = self._ep.register
+        response = self._post_json(url, data)
+        return response.json()
+
+    def bulk_register_users(self, rows):
+        """POST /auth/register/bulk"""
+        url = self._ep.register_bulk
+        response = self._post_json(url, {"items": rows}, bulk=True)
         return response.json()
 
     def verify_token(self):
         """GET /verify/token"""
-        url = f"{self.user_service_url}/verify/token"
-        headers = self._get_auth_headers()
-        response = self.session.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
+        url = self._ep.verify_token
+        response = self.session.get(url, timeout=DEFAULT_TIMEOUT)
         return response.json()
 
     # ---------- Pacientes ----------
 
     def list_patients(self, params=None):
         """GET /admin/pacientes"""
-        url = f"{self.user_service_url}/admin/pacientes"
-        headers = self._get_auth_headers()
-        response = self.session.get(url, headers=headers, params=params, timeout=DEFAULT_TIMEOUT)
-        return response.json()
+        url = self._ep.patients
+        response = self.session.get(url, params=params, timeout=DEFAULT_TIMEOUT)
+        return _decode_json(response)
 
     def get_patient(self, patient_id):
         """GET /admin/pacientes/{id}"""
-        url = f"{self.user_service_url}/admin/pacientes/{patient_id}"
-        headers = self._get_auth_headers()
-        response = self.session.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
-        return response.json()
+        url = self._ep.patient % patient_id
+        return self._conditional_get(url)[1]
 
     def create_patient(self, data):
         """POST /admin/pacientes"""
-        url = f"{self.user_service_url}/admin/pacientes"
-        headers = self._get_auth_headers()
-        response = self.session.post(url, headers=headers, json=data, timeout=DEFAULT_TIMEOUT)
+        url = self._ep.patients
+        response = self._post_json(url, data)
+        return response.json()
+
+    def bulk_create_patients(self, rows):
+        """POST /admin/pacientes/bulk"""
+        url = self._ep.patients_bulk
+        response = self._post_json(url, {"items": rows}, bulk=True)
         return response.json()
 
     def update_patient(self, patient_id, data):
         """PUT /admin/pacientes/{id}"""
-        url = f"{self.user_service_url}/admin/pacientes/{patient_id}"
-        headers = self._get_auth_headers()
-        response = self.session.put(url, headers=headers, json=data, timeout=DEFAULT_TIMEOUT)
+        url = self._ep.patient % patient_id
+        response = self._put_json(url, data)
         return response.json()
 
     def delete_patient(self, patient_id):
         """DELETE /admin/pacientes/{id}"""
-        url = f"{self.user_service_url}/admin/pacientes/{patient_id}"
-        headers = self._get_auth_headers()
-        response = self.session.delete(url, headers=headers, timeout=DEFAULT_TIMEOUT)
+        url = self._ep.patient % patient_id
+        response = self.session.delete(url, timeout=DEFAULT_TIMEOUT)
         return response.json()
 
     # ---------- Doctores ----------
 
     def list_doctors(self, params=None):
         """GET /admin/doctores"""
-        url = f"{self.user_service_url}/admin/doctores"
-        headers = self._get_auth_headers()
-        response = self.session.get(url, headers=headers, params=params, timeout=DEFAULT_TIMEOUT)
-        return response.json()
+        url = self._ep.doctors
+        return self._cached_get("doctores", url, params)
 
     def get_doctor(self, doctor_id):
         """GET /admin/doctores/{id}"""
-        url = f"{self.user_service_url}/admin/doctores/{doctor_id}"
-        headers = self._get_auth_headers()
-        response = self.session.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
-        return response.json()
+        url = self._ep.doctor % doctor_id
+        return self._cached_get("doctores", url)
 
     def create_doctor(self, data):
         """POST /admin/doctores"""
-        url = f"{self.user_service_url}/admin/doctores"
-        headers = self._get_auth_headers()
-        response = self.session.post(url, headers=headers, json=data, timeout=DEFAULT_TIMEOUT)
+        url = self._ep.doctors
+        response = self._post_json(url, data)
+        self._invalidate_cache("doctores")
+        return response.json()
+
+    def bulk_create_doctors(self, rows):
+        """POST /admin/doctores/bulk"""
+        url = self._ep.doctors_bulk
+        response = self._post_json(url, {"items": rows}, bulk=True)
+        self._invalidate_cache("doctores")
         return response.json()
 
     def update_doctor(self, doctor_id, data):
         """PUT /admin/doctores/{id}"""
-        url = f"{self.user_service_url}/admin/doctores/{doctor_id}"
-        headers = self._get_auth_headers()
-        response = self.session.put(url, headers=headers, json=data, timeout=DEFAULT_TIMEOUT)
+        url = self._ep.doctor % doctor_id
+        response = self._put_json(url, data)
+        self._invalidate_cache("doctores")
         return response.json()
 
     def delete_doctor(self, doctor_id):
         """DELETE /admin/doctores/{id}"""
-        url = f"{self.user_service_url}/admin/doctores/{doctor_id}"
-        headers = self._get_auth_headers()
-        response = self.session.delete(url, headers=headers, timeout=DEFAULT_TIMEOUT)
+        url = self._ep.doctor % doctor_id
+        response = self.session.delete(url, timeout=DEFAULT_TIMEOUT)
+        self._invalidate_cache("doctores")
         return response.json()
 
     # ---------- Centros ----------
 
     def list_centers(self, params=None):
         """GET /admin/centros"""
-        url = f"{self.user_service_url}/admin/centros"
-        headers = self._get_auth_headers()
-        response = self.session.get(url, headers=headers, params=params, timeout=DEFAULT_TIMEOUT)
-        return response.json()
+        url = self._ep.centers
+        return self._cached_get("centros", url, params)
 
     def get_center(self, center_id):
         """GET /admin/centros/{id}"""
-        url = f"{self.user_service_url}/admin/centros/{center_id}"
-        headers = self._get_auth_headers()
-        response = self.session.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
-        return response.json()
+        url = self._ep.center % center_id
+        return self._cached_get("centros", url)
 
     def create_center(self, data):
         """POST /admin/centros"""
-        url = f"{self.user_service_url}/admin/centros"
-        headers = self._get_auth_headers()
-        response = self.session.post(url, headers=headers, json=data, timeout=DEFAULT_TIMEOUT)
+        url = self._ep.centers
+        response = self._post_json(url, data)
+        self._invalidate_cache("centros")
+        return response.json()
+
+    def bulk_create_centers(self, rows):
+        """POST /admin/centros/bulk"""
+        url = self._ep.centers_bulk
+        response = self._post_json(url, {"items": rows}, bulk=True)
+        self._invalidate_cache("centros")
         return response.json()
 
     def update_center(self, center_id, data):
         """PUT /admin/centros/{id}"""
-        url = f"{self.user_service_url}/admin/centros/{center_id}"
-        headers = self._get_auth_headers()
-        response = self.session.put(url, headers=headers, json=data, timeout=DEFAULT_TIMEOUT)
+        url = self._ep.center % center_id
+        response = self._put_json(url, data)
+        self._invalidate_cache("centros")
         return response.json()
 
     def delete_center(self, center_id):
         """DELETE /admin/centros/{id}"""
-        url = f"{self.user_service_url}/admin/centros/{center_id}"
-        headers = self._get_auth_headers()
-        response = self.session.delete(url, headers=headers, timeout=DEFAULT_TIMEOUT)
+        url = self._ep.center % center_id
+        response = self.session.delete(url, timeout=DEFAULT_TIMEOUT)
+        self._invalidate_cache("centros")
         return response.json()
 
     # ---------- Citas ----------
 
     def list_appointments(self, params=None):
         """GET /citas"""
-        url = f"{self.appointment_service_url}/citas"
-        headers = self._get_auth_headers()
-        response = self.session.get(url, headers=headers, params=params, timeout=DEFAULT_TIMEOUT)
-        return response.json()
+        url = self._ep.appointments
+        response = self.session.get(url, params=params, timeout=DEFAULT_TIMEOUT)
+        return _decode_json(response)
 
     def get_appointment(self, appointment_id):
         """GET /citas/{id}"""
-        url = f"{self.appointment_service_url}/citas/{appointment_id}"
-        headers = self._get_auth_headers()
-        response = self.session.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
+        url = self._ep.appointment % appointment_id
+        response = self.session.get(url, timeout=DEFAULT_TIMEOUT)
         return response.json()
 
     def create_appointment(self, data):
         """POST /citas"""
-        url = f"{self.appointment_service_url}/citas"
-        headers = self._get_auth_headers()
-        response = self.session.post(url, headers=headers, json=data, timeout=DEFAULT_TIMEOUT)
+        url = self._ep.appointments
+        response = self._post_json(url, data)
+        return response.json()
+
+    def create_appointments_bulk(self, rows):
+        """POST /citas/bulk"""
+        url = self._ep.appointments_bulk
+        response = self._post_json(url, {"items": rows}, bulk=True)
         return response.json()
 
     def cancel_appointment(self, appointment_id):
         """PUT /citas/{id}"""
-        url = f"{self.appointment_service_url}/citas/{appointment_id}"
-        headers = self._get_auth_headers()
-        response = self.session.put(url, headers=headers, timeout=DEFAULT_TIMEOUT)
+        url = self._ep.appointment % appointment_id
+        response = self.session.put(url, timeout=DEFAULT_TIMEOUT)
         return response.json()
 
-    # ---------- Helpers ----------
+    # ---------- Recorrido completo de listados ----------
+
+    def _iter_pages(self, fetch, key, params, next_params):
+        """Genera todos los elementos de un listado paginado
+
+        Mientras se consume una página, la siguiente ya se está pidiendo en
+        segundo plano. next_params(params, result) devuelve los parámetros de
+        la página siguiente o None si no hay más.
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(fetch, params)
+            while future is not None:
+                result = future.result()
+                if key not in result:
+                    raise RuntimeError(result.get("error") or result.get("msg"))
+                params = next_params(params, result)
+                future = executor.submit(fetch, params) if params else None
+                yield from result[key]
+
+    def _iter_by_page(self, fetch, key, params):
+        """Recorre un listado de user_service (paginación por clave after_id)"""
+
+        def next_params(params, result):
+            next_after_id = result.get("meta", {}).get("next_after_id")
+            if next_after_id is None:
+                return None
+            return dict(params, after_id=next_after_id)
+
+        params = dict(params or {}, after_id=0, per_page=DEFAULT_PAGE_SIZE)
+        return self._iter_pages(fetch, key, params, next_params)
 
-    def _get_auth_headers(self):
-        """Retorna headers con token JWT"""
-        if not self._token:
-            return {}
-        return {"Authorization": f"Bearer {self._token}"}
+    def iter_patients(self, params=None):
+        """Todos los pacientes que cumplen los filtros, página a página"""
+        return self._iter_by_page(self.list_patients, "pacientes", params)
+
+    def iter_doctors(self, params=None):
+        """Todos los doctores que cumplen los filtros, página a página"""
+        return self._iter_by_page(self.list_doctors, "doctores", params)
+
+    def iter_centers(self, params=None):
+        """Todos los centros que cumplen los filtros, página a página"""
+        return self._iter_by_page(self.list_centers, "centros", params)
+
+    def iter_appointments(self, params=None):
+        """Todas las citas que cumplen los filtros (paginación limit/offset)"""
+
+        def next_params(params, result):
+            if len(result["citas"]) < params["limit"]:
+                return None
+            return dict(params, offset=params["offset"] + params["limit"])
+
+        params = dict(params or {}, limit=DEFAULT_APPOINTMENT_PAGE_SIZE, offset=0)
+        return self._iter_pages(self.list_appointments, "citas", params, next_params)
 
 
 # ---------- Funciones de utilidad para el menú ----------
@@ -315,6 +571,8 @@ def _prompt(message, default=""):
 
 def _prompt_secret(message):
     """Pide password al usuario"""
+    import getpass
+
     return getpass.getpass(message + ": ")
 
 
@@ -322,15 +580,35 @@ def _prompt_int(message, default=None):
     """Pide un número entero al usuario"""
     while True:
         val = _prompt(message, str(default) if default is not None else "")
-        try:
-            return int(val) if val else default
-        except ValueError:
-            print("Por favor, introduce un número válido.")
+        if not val:
+            return default
+        if _INT_RE.fullmatch(val):
+            return int(val)
+        print("Por favor, introduce un número válido.")
+
+
+def _json_text(data):
+    """JSON formateado como texto"""
+    if orjson is not None:
+        return orjson.dumps(
+            data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        ).decode()
+    return json.dumps(data, indent=2, ensure_ascii=False)
 
 
 def _print_json(data):
     """Imprime JSON formateado"""
-    print(json.dumps(data, indent=2, ensure_ascii=False))
+    print(_json_text(data))
+
+
+def _print_all(items, key):
+    """Imprime todos los elementos de un listado recorrido página a página"""
+    try:
+        items = list(items)
+    except RuntimeError as e:
+        print_error(f"Error al recorrer el listado: {e}")
+        return
+    _print_json({key: items, "total": len(items)})
 
 
 # ---------- Menús interactivos ----------
@@ -394,9 +672,14 @@ def _menu_patients(client):
                 nombre = _prompt("filtro nombre (opcional)", "")
                 if nombre:
                     params["nombre"] = nombre
-                page = _prompt_int("page", "1")
-                if page:
-                    params["page"] = page
+                page = _prompt_int("page (vacío = todas)", "")
+                if not page:
+                    print(f"\n[REQUEST] GET /admin/pacientes (todas las páginas)")
+                    print(f"Params: {params}")
+                    print(f"\n[RESPONSE]")
+                    _print_all(client.iter_patients(params), "pacientes")
+                    continue
+                params["page"] = page
                 per_page = _prompt_int("per_page", "10")
                 if per_page:
                     params["per_page"] = per_page
@@ -510,9 +793,14 @@ def _menu_doctors(client):
                 especialidad = _prompt("filtro especialidad (opcional)", "")
                 if especialidad:
                     params["especialidad"] = especialidad
-                page = _prompt_int("page", "1")
-                if page:
-                    params["page"] = page
+                page = _prompt_int("page (vacío = todas)", "")
+                if not page:
+                    print(f"\n[REQUEST] GET /admin/doctores (todas las páginas)")
+                    print(f"Params: {params}")
+                    print(f"\n[RESPONSE]")
+                    _print_all(client.iter_doctors(params), "doctores")
+                    continue
+                params["page"] = page
                 per_page = _prompt_int("per_page", "10")
                 if per_page:
                     params["per_page"] = per_page
@@ -623,9 +911,14 @@ def _menu_centers(client):
                 estado = _prompt("estado (ACTIVO/INACTIVO, opcional)", "")
                 if estado:
                     params["estado"] = estado
-                page = _prompt_int("page", "1")
-                if page:
-                    params["page"] = page
+                page = _prompt_int("page (vacío = todas)", "")
+                if not page:
+                    print(f"\n[REQUEST] GET /admin/centros (todas las páginas)")
+                    print(f"Params: {params}")
+                    print(f"\n[RESPONSE]")
+                    _print_all(client.iter_centers(params), "centros")
+                    continue
+                params["page"] = page
                 per_page = _prompt_int("per_page", "10")
                 if per_page:
                     params["per_page"] = per_page
@@ -748,11 +1041,11 @@ def _menu_appointments(client):
                 if estado:
                     params["estado"] = estado
 
-                print(f"\n[REQUEST] GET /citas")
+                # GET /citas devuelve como máximo `limit` citas por petición
+                print(f"\n[REQUEST] GET /citas (todas las páginas)")
                 print(f"Params: {params}")
                 print(f"\n[RESPONSE]")
-                result = client.list_appointments(params)
-                _print_json(result)
+                _print_all(client.iter_appointments(params), "citas")
 
             elif choice == "2":
                 # Obtener por ID
@@ -863,7 +1156,7 @@ def run_interactive_menu(client):
 
                 elif choice == "2":
                     # Cerrar sesión
-                    client._token = None
+                    client.logout()
                     print_warning("Sesión cerrada correctamente")
 
                 elif choice == "3":
@@ -895,44 +1188,206 @@ def run_interactive_menu(client):
 # ---------- Carga Masiva CSV ----------
 
 
-def _load_csv_file(csv_path):
-    """Lee un archivo CSV y retorna una lista de diccionarios"""
-    rows = []
+def _csv_header(csv_path):
+    """Nombres de columna de la primera línea del CSV"""
+    import csv
+
     with open(csv_path, "r", newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            cleaned_row = {k: (v if v else None) for k, v in row.items()}
-            rows.append(cleaned_row)
-    return rows
+        return next(csv.reader(f), [])
 
 
-def _bulk_load_users(client, csv_path):
-    """Carga masiva de usuarios desde CSV"""
-    print(f"\n[CSV] Cargando usuarios desde: {csv_path}")
-    rows = _load_csv_file(csv_path)
+def _check_csv_columns(csv_path, columns):
+    """Comprueba, antes de enviar nada, que el CSV tiene esas columnas"""
+    import csv
 
-    ok = failed = 0
-    for i, row in enumerate(rows, start=2):
+    try:
+        header = _csv_header(csv_path)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        print_error(f"No se pudo leer el CSV: {e}")
+        return False
+    missing = [name for name in columns if name not in header]
+    if missing:
+        print_error(f"Faltan columnas en el CSV: {', '.join(missing)}")
+        return False
+    return True
+
+
+def _iter_csv_rows(csv_path):
+    """Genera las filas de un archivo CSV como diccionarios, de una en una
+
+    Si pyarrow está instalado se usa su lector en C por bloques; si no,
+    csv.reader. En ambos casos los valores son texto y las celdas vacías
+    quedan en None. pyarrow rechaza las filas con otro número de columnas:
+    desde el bloque que contiene una, el resto se lee con csv.reader.
+    """
+    import csv
+
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        pa = None
+
+    # Filas ya generadas por pyarrow, que csv.reader debe saltarse
+    done = 0
+    if pa is not None:
+        header = _csv_header(csv_path)
+        if not header:
+            return
         try:
-            data = {
-                "username": row.get("username"),
-                "password": row.get("password"),
-            }
-            if row.get("rol"):
-                data["rol"] = row.get("rol")
-
-            print(f"\n[REQUEST] POST /auth/register [L{i}]")
-            print("Payload:")
-            _print_json(data)
-
-            result = client.register_user(data)
-            print("\n[RESPONSE]")
-            _print_json(result)
-            ok += 1
+            reader = pacsv.open_csv(
+                csv_path,
+                convert_options=pacsv.ConvertOptions(
+                    column_types={name: pa.string() for name in header},
+                    null_values=[""],
+                    strings_can_be_null=True,
+                ),
+            )
+            for batch in reader:
+                rows = batch.to_pylist()
+                yield from rows
+                done += len(rows)
+            return
+        except pa.ArrowInvalid:
+            pass
+
+    # csv.reader + cabecera: un solo dict por fila (DictReader crea dos)
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return
+        for row in islice(filter(None, reader), done, None):
+            # Las celdas que falten en filas cortas también quedan en None
+            cells = zip_longest(header, row[: len(header)])
+            yield {k: (v if v else None) for k, v in cells}
+
+
+def _row_error(result):
+    """Mensaje de error de una fila, o None si se creó correctamente"""
+    if isinstance(result, Exception):
+        return str(result)
+    if "error" in result or "msg" in result:
+        return result.get("error") or result.get("msg")
+    return None
+
 
+# Formatos de las líneas de la carga masiva, creados una sola vez
+_ROW_ERROR_FMT = "[ERROR][L{}] {}"
+_ROW_REQUEST_FMT = "\n[REQUEST] {} [L{}]\nPayload:\n{}\n"
+_ROW_RESPONSE_FMT = "[RESPONSE]\n{}"
+_CHUNK_ERROR_FMT = "[ERROR] {} [L{}-L{}] {}"
+_PROGRESS_FMT = "[PROGRESO] {}: {} filas procesadas"
+_READ_ERROR_FMT = "[ERROR] {}: no se pudo leer el CSV tras {} filas: {}"
+
+
+def _format_row(label, i, data, result, error):
+    """Texto de una fila de la carga masiva; solo los errores salvo VERBOSE"""
+    if not VERBOSE:
+        return _ROW_ERROR_FMT.format(i, error)
+    text = _ROW_REQUEST_FMT.format(label, i, _json_text(data))
+    if error is not None:
+        return text + _ROW_ERROR_FMT.format(i, error)
+    return text + _ROW_RESPONSE_FMT.format(_json_text(result))
+
+
+def _write_block(lines):
+    """Escribe de una vez las líneas acumuladas de un lote"""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+
+
+def _run_bulk_batches(send, label, items, chunk_size=DEFAULT_BULK_CHUNK):
+    """Envía las filas en lotes de chunk_size a un endpoint /bulk
+
+    send: método del cliente que recibe la lista de payloads de un lote.
+    items: iterable de tuplas (línea del CSV, payload).
+    """
+    ok = failed = 0
+    pending = iter(items)
+    while True:
+        # Un CSV ilegible se informa y termina la carga sin cerrar el cliente
+        try:
+            chunk = list(islice(pending, chunk_size))
+        except Exception as e:
+            _write_block([_READ_ERROR_FMT.format(label, ok + failed, e)])
+            break
+        if not chunk:
+            break
+        lines = []
+        try:
+            result = send([data for _, data in chunk])
+            resultados = result.get("resultados")
+            if resultados is None:
+                raise RuntimeError(_row_error(result) or result)
         except Exception as e:
-            print(f"\n[ERROR][L{i}] {e}")
-            failed += 1
+            lines.append(_CHUNK_ERROR_FMT.format(label, chunk[0][0], chunk[-1][0], e))
+            failed += len(chunk)
+        else:
+            for (i, data), resultado in zip(chunk, resultados):
+                error = _row_error(resultado)
+                if error is None:
+                    ok += 1
+                    if VERBOSE:
+                        lines.append(_format_row(label, i, data, resultado, None))
+                else:
+                    failed += 1
+                    lines.append(_format_row(label, i, data, resultado, error))
+
+        lines.append(_PROGRESS_FMT.format(label, ok + failed))
+        _write_block(lines)
+
+    return ok, failed
+
+
+def _row_mapper(required, optional=()):
+    """Crea la función que convierte una fila del CSV en el payload de la API
+
+    Las columnas de required se copian siempre; las de optional solo si la
+    celda tiene valor. Cada columna se lee una sola vez por fila.
+    """
+
+    def mapper(row):
+        get = row.get
+        data = {key: get(key) for key in required}
+        for key in optional:
+            value = get(key)
+            if value:
+                data[key] = value
+        return data
+
+    return mapper
+
+
+# Conversión fila -> payload de cada tipo de carga, creada una sola vez
+_USER_COLUMNS = ("username", "password")
+_USER_ROW = _row_mapper(_USER_COLUMNS, ("rol",))
+_ENTITY_COLUMNS = ("nombre",)
+_PATIENT_ROW = _row_mapper(_ENTITY_COLUMNS, ("telefono", "estado"))
+_DOCTOR_ROW = _row_mapper(_ENTITY_COLUMNS, ("especialidad", "estado"))
+_CENTER_ROW = _row_mapper(_ENTITY_COLUMNS, ("direccion", "estado"))
+_APPOINTMENT_COLUMNS = ("fecha", "motivo", "id_paciente", "id_doctor", "id_centro")
+
+
+def _csv_items(csv_path, mapper):
+    """Genera (línea del CSV, payload) aplicando mapper a cada fila"""
+    for i, row in enumerate(_iter_csv_rows(csv_path), start=2):
+        yield i, mapper(row)
+
+
+def _bulk_load_users(client, csv_path):
+    """Carga masiva de usuarios desde CSV"""
+    print(f"\n[CSV] Cargando usuarios desde: {csv_path}")
+    if not _check_csv_columns(csv_path, _USER_COLUMNS):
+        return 0, 0
+
+    ok, failed = _run_bulk_batches(
+        client.bulk_register_users,
+        "POST /auth/register/bulk",
+        _csv_items(csv_path, _USER_ROW),
+        DEFAULT_USER_BULK_CHUNK,
+    )
 
     print(f"\n[RESUMEN] Usuarios: OK={ok}, Fallidos={failed}")
     return ok, failed
@@ -941,31 +1396,14 @@ def _bulk_load_users(client, csv_path):
 def _bulk_load_patients(client, csv_path):
     """Carga masiva de pacientes desde CSV"""
     print(f"\n[CSV] Cargando pacientes desde: {csv_path}")
-    rows = _load_csv_file(csv_path)
+    if not _check_csv_columns(csv_path, _ENTITY_COLUMNS):
+        return 0, 0
 
-    ok = failed = 0
-    for i, row in enumerate(rows, start=2):
-        try:
-            data = {
-                "nombre": row.get("nombre"),
-            }
-            if row.get("telefono"):
-                data["telefono"] = row.get("telefono")
-            if row.get("estado"):
-                data["estado"] = row.get("estado")
-
-            print(f"\n[REQUEST] POST /admin/pacientes [L{i}]")
-            print("Payload:")
-            _print_json(data)
-
-            result = client.create_patient(data)
-            print("\n[RESPONSE]")
-            _print_json(result)
-            ok += 1
-
-        except Exception as e:
-            print(f"\n[ERROR][L{i}] {e}")
-            failed += 1
+    ok, failed = _run_bulk_batches(
+        client.bulk_create_patients,
+        "POST /admin/pacientes/bulk",
+        _csv_items(csv_path, _PATIENT_ROW),
+    )
 
     print(f"\n[RESUMEN] Pacientes: OK={ok}, Fallidos={failed}")
     return ok, failed
@@ -974,31 +1412,14 @@ def _bulk_load_patients(client, csv_path):
 def _bulk_load_doctors(client, csv_path):
     """Carga masiva de doctores desde CSV"""
     print(f"\n[CSV] Cargando doctores desde: {csv_path}")
-    rows = _load_csv_file(csv_path)
-
-    ok = failed = 0
-    for i, row in enumerate(rows, start=2):
-        try:
-            data = {
-                "nombre": row.get("nombre"),
-            }
-            if row.get("especialidad"):
-                data["especialidad"] = row.get("especialidad")
-            if row.get("estado"):
-                data["estado"] = row.get("estado")
-
-            print(f"\n[REQUEST] POST /admin/doctores [L{i}]")
-            print("Payload:")
-            _print_json(data)
-
-            result = client.create_doctor(data)
-            print("\n[RESPONSE]")
-            _print_json(result)
-            ok += 1
+    if not _check_csv_columns(csv_path, _ENTITY_COLUMNS):
+        return 0, 0
 
-        except Exception as e:
-            print(f"\n[ERROR][L{i}] {e}")
-            failed += 1
+    ok, failed = _run_bulk_batches(
+        client.bulk_create_doctors,
+        "POST /admin/doctores/bulk",
+        _csv_items(csv_path, _DOCTOR_ROW),
+    )
 
     print(f"\n[RESUMEN] Doctores: OK={ok}, Fallidos={failed}")
     return ok, failed
@@ -1007,31 +1428,14 @@ def _bulk_load_doctors(client, csv_path):
 def _bulk_load_centers(client, csv_path):
     """Carga masiva de centros desde CSV"""
     print(f"\n[CSV] Cargando centros desde: {csv_path}")
-    rows = _load_csv_file(csv_path)
-
-    ok = failed = 0
-    for i, row in enumerate(rows, start=2):
-        try:
-            data = {
-                "nombre": row.get("nombre"),
-            }
-            if row.get("direccion"):
-                data["direccion"] = row.get("direccion")
-            if row.get("estado"):
-                data["estado"] = row.get("estado")
-
-            print(f"\n[REQUEST] POST /admin/centros [L{i}]")
-            print("Payload:")
-            _print_json(data)
-
-            result = client.create_center(data)
-            print("\n[RESPONSE]")
-            _print_json(result)
-            ok += 1
+    if not _check_csv_columns(csv_path, _ENTITY_COLUMNS):
+        return 0, 0
 
-        except Exception as e:
-            print(f"\n[ERROR][L{i}] {e}")
-            failed += 1
+    ok, failed = _run_bulk_batches(
+        client.bulk_create_centers,
+        "POST /admin/centros/bulk",
+        _csv_items(csv_path, _CENTER_ROW),
+    )
 
     print(f"\n[RESUMEN] Centros: OK={ok}, Fallidos={failed}")
     return ok, failed
@@ -1040,31 +1444,30 @@ def _bulk_load_centers(client, csv_path):
 def _bulk_load_appointments(client, csv_path):
     """Carga masiva de citas desde CSV"""
     print(f"\n[CSV] Cargando citas desde: {csv_path}")
-    rows = _load_csv_file(csv_path)
-
-    ok = failed = 0
-    for i, row in enumerate(rows, start=2):
-        try:
-            data = {
-                "fecha": row.get("fecha"),
-                "motivo": row.get("motivo"),
-                "id_paciente": int(row.get("id_paciente")),
-                "id_doctor": int(row.get("id_doctor")),
-                "id_centro": int(row.get("id_centro")),
-            }
-
-            print(f"\n[REQUEST] POST /citas [L{i}]")
-            print("Payload:")
-            _print_json(data)
-
-            result = client.create_appointment(data)
-            print("\n[RESPONSE]")
-            _print_json(result)
-            ok += 1
-
-        except Exception as e:
-            print(f"\n[ERROR][L{i}] {e}")
-            failed += 1
+    if not _check_csv_columns(csv_path, _APPOINTMENT_COLUMNS):
+        return 0, 0
+    invalid = []
+
+    def items():
+        for i, row in enumerate(_iter_csv_rows(csv_path), start=2):
+            try:
+                data = {
+                    "fecha": row.get("fecha"),
+                    "motivo": row.get("motivo"),
+                    "id_paciente": int(row.get("id_paciente")),
+                    "id_doctor": int(row.get("id_doctor")),
+                    "id_centro": int(row.get("id_centro")),
+                }
+            except (TypeError, ValueError) as e:
+                print(_ROW_ERROR_FMT.format(i, e))
+                invalid.append(i)
+                continue
+            yield i, data
+
+    ok, failed = _run_bulk_batches(
+        client.create_appointments_bulk, "POST /citas/bulk", items()
+    )
+    failed += len(invalid)
 
     print(f"\n[RESUMEN] Citas: OK={ok}, Fallidos={failed}")
     return ok, failed
@@ -1118,11 +1521,11 @@ def _menu_bulk_load(client):
 
     # Seleccionar tipo de carga
     print(f"\n{Colors.BLUE}Tipo de carga:{Colors.RESET}")
-    print_item("1", "Usuarios (POST /auth/register)")
-    print_item("2", "Pacientes (POST /admin/pacientes)")
-    print_item("3", "Doctores (POST /admin/doctores)")
-    print_item("4", "Centros (POST /admin/centros)")
-    print_item("5", "Citas (POST /citas)")
+    print_item("1", "Usuarios (POST /auth/register/bulk)")
+    print_item("2", "Pacientes (POST /admin/pacientes/bulk)")
+    print_item("3", "Doctores (POST /admin/doctores/bulk)")
+    print_item("4", "Centros (POST /admin/centros/bulk)")
+    print_item("5", "Citas (POST /citas/bulk)")
     print(f"\n  {Colors.DIM}0) Cancelar{Colors.RESET}")
 
     choice = _prompt("Opción", "1")
@@ -1166,6 +1569,13 @@ def parse_args():
         default=DEFAULT_APPOINTMENT_SERVICE_URL,
         help=f"URL del servicio de citas (default: {DEFAULT_APPOINTMENT_SERVICE_URL})",
     )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        default=VERBOSE,
+        help="Mostrar payload y respuesta de cada fila en la carga masiva",
+    )
     return parser.parse_args()
 
 
@@ -1173,7 +1583,10 @@ def parse_args():
 
 
 def main():
+    global VERBOSE
+
     args = parse_args()
+    VERBOSE = args.verbose
 
     client = RestClient(args.user_service, args.appointment_service)
 
@@ -5,34 +5,151 @@
 # - Listados con filtros y paginación
 # - CRUD completo
 
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from functools import wraps
 
-from flask import Blueprint, Flask, jsonify, request
+import orjson
+from cachetools import TTLCache
+from flask import Blueprint, Flask, Response, g, jsonify, request
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from flask_compress import Compress
 from flask_cors import CORS
 from flask_jwt_extended import (
     JWTManager,
     create_access_token,
+    get_jwt,
     get_jwt_identity,
     jwt_required,
 )
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, event, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
 from werkzeug.security import check_password_hash, generate_password_hash
 
+
+class ORJSONProvider(JSONProvider):
+    """Proveedor JSON de Flask (jsonify, request.get_json) basado en orjson"""
+
+    OPCIONES = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj, default=DefaultJSONProvider.default, option=self.OPCIONES
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # orjson ya devuelve bytes: se evita el paso intermedio por str
+        obj = self._prepare_response_obj(args, kwargs)
+        cuerpo = orjson.dumps(
+            obj, default=DefaultJSONProvider.default, option=self.OPCIONES
+        )
+        return self._app.response_class(cuerpo, mimetype="application/json")
+
+
+class JWTManagerConCache(JWTManager):
+    """JWTManager que recuerda unos segundos los tokens ya verificados.
+
+    Un token repetido (el cliente envía el mismo en cada petición) se sirve
+    desde la caché sin volver a comprobar la firma HMAC ni decodificarlo.
+    Sobrescribe un método privado de Flask-JWT-Extended, por eso la versión
+    está fijada en requirements.txt.
+    """
+
+    def __init__(self, app=None, **kwargs):
+        self._tokens = TTLCache(maxsize=10_000, ttl=5)
+        self._tokens_lock = threading.Lock()
+        super().__init__(app, **kwargs)
+
+    def _decode_jwt_from_config(
+        self, encoded_token, csrf_value=None, allow_expired=False
+    ):
+        if csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(
+                encoded_token, csrf_value, allow_expired
+            )
+        with self._tokens_lock:
+            claims = self._tokens.get(encoded_token)
+        # Un token caducado dentro de la ventana de la caché se vuelve a
+        # decodificar para que se rechace como siempre
+        if claims is None or claims.get("exp", float("inf")) <= time.time():
+            claims = super()._decode_jwt_from_config(encoded_token)
+            with self._tokens_lock:
+                self._tokens[encoded_token] = claims
+        return claims
+
+
 # Configuración de la aplicación Flask
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
 # Configuración de la base de datos SQLite
 app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///user_service.db"
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+    # Conexiones reutilizables entre peticiones concurrentes
+    "pool_size": 16,
+    "max_overflow": 8,
+    "pool_pre_ping": True,
+    "pool_recycle": 3600,
+    # Permitir compartir conexiones entre hilos y esperar hasta 30 s por el
+    # bloqueo de escritura en lugar de fallar de inmediato
+    "connect_args": {"check_same_thread": False, "timeout": 30},
+}
 
 # Configuración de JWT
 app.config["JWT_SECRET_KEY"] = "clave-secreta-cambiar-en-produccion"
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
 
+# Compresión gzip de las respuestas JSON (listados, resultados de lotes)
+app.config["COMPRESS_MIMETYPES"] = ["application/json"]
+app.config["COMPRESS_ALGORITHM"] = "gzip"
+app.config["COMPRESS_MIN_SIZE"] = 500
+
+# Máximo de elementos aceptados por los endpoints de carga masiva
+MAX_ITEMS_LOTE = 1000
+# Máximo de usuarios por registro masivo: cada uno calcula un hash scrypt
+MAX_USUARIOS_LOTE = 100
+# Tamaño máximo del cuerpo de una carga masiva una vez descomprimido
+MAX_BYTES_LOTE = 16 * 1024 * 1024
+# Longitud admitida de los filtros de texto de los listados
+LONGITUD_FILTRO = (2, 100)
+
+# Hilos para calcular hashes de contraseñas en las cargas masivas
+_hash_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+
 # Inicialización de extensiones
-db = SQLAlchemy(app)
-jwt = JWTManager(app)
+# expire_on_commit=False: tras el commit las instancias conservan sus valores
+# (id incluido) y la respuesta se construye sin otro SELECT por objeto
+db = SQLAlchemy(app, session_options={"expire_on_commit": False})
+jwt = JWTManagerConCache(app)
 CORS(app)
+Compress(app)
+
+
+@event.listens_for(Engine, "connect")
+def configurar_sqlite(dbapi_connection, connection_record):
+    """Activa WAL y ajusta pragmas de SQLite en cada conexión nueva"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
+
 
 # ========================================
 # MODELOS DE DATOS (SQLAlchemy)
@@ -59,6 +176,9 @@ class Patient(db.Model):
     estado = db.Column(db.String(20), default="ACTIVO")  # ACTIVO/INACTIVO
     id_usuario = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
 
+    # Listados: filtro por estado y orden (o paginación por clave) por id
+    __table_args__ = (db.Index("ix_patient_estado_id", "estado", "id"),)
+
 
 class Doctor(db.Model):
     """Modelo de doctor"""
@@ -69,6 +189,9 @@ class Doctor(db.Model):
     estado = db.Column(db.String(20), default="ACTIVO")  # ACTIVO/INACTIVO
     id_usuario = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
 
+    # Listados: filtro por estado y orden (o paginación por clave) por id
+    __table_args__ = (db.Index("ix_doctor_estado_id", "estado", "id"),)
+
 
 class Center(db.Model):
     """Modelo de centro médico"""
@@ -78,37 +201,200 @@ class Center(db.Model):
     direccion = db.Column(db.String(200))
     estado = db.Column(db.String(20), default="ACTIVO")  # ACTIVO/INACTIVO
 
+    # Listados: filtro por estado y orden (o paginación por clave) por id
+    __table_args__ = (db.Index("ix_center_estado_id", "estado", "id"),)
+
 
 # ========================================
 # HELPERS
 # ========================================
 
+# Usuario por nombre (login y registro): la sentencia se construye una sola vez
+# y SQLAlchemy reutiliza su SQL compilado en cada ejecución
+_usuario_por_nombre = select(User).where(User.username == bindparam("username"))
 
-def require_admin():
-    """Verifica que el usuario actual exista y sea admin."""
-    user_id = get_jwt_identity()
-    usuario_actual = User.query.get(int(user_id)) if user_id is not None else None
-    if not usuario_actual or usuario_actual.rol != "admin":
-        return None
-    return usuario_actual
+
+def id_activo(modelo, id_):
+    """Id de la fila ACTIVO con ese id, o None; solo se lee la columna id."""
+    return db.session.scalar(
+        select(modelo.id).where(modelo.id == id_, modelo.estado == "ACTIVO")
+    )
+
+
+def ids_activos(modelo, ids):
+    """Conjunto de los ids de la lista que son filas ACTIVO (una consulta IN)"""
+    return set(
+        db.session.scalars(
+            select(modelo.id).where(modelo.id.in_(set(ids)), modelo.estado == "ACTIVO")
+        )
+    )
 
 
-def paginate_query(query):
-    """Aplica paginación estándar a una query SQLAlchemy."""
-    page = request.args.get("page", default=1, type=int)
+def buscar_usuario(username):
+    """Usuario con ese username, o None."""
+    return db.session.execute(
+        _usuario_por_nombre, {"username": username}
+    ).scalar_one_or_none()
+
+
+def require_admin():
+    """Verifica que el usuario actual sea admin.
+
+    El rol viaja como claim en el JWT (los usuarios no se modifican ni se
+    borran), así que no hace falta consultar la base de datos. Los tokens sin
+    ese claim se comprueban contra la tabla de usuarios. El resultado se
+    guarda en g para el resto de la petición.
+    """
+    if "es_admin" not in g:
+        rol = get_jwt().get("rol")
+        if rol is None:
+            user_id = get_jwt_identity()
+            usuario = (
+                db.session.get(User, int(user_id)) if user_id is not None else None
+            )
+            rol = usuario.rol if usuario else None
+        g.es_admin = rol == "admin"
+    return g.es_admin
+
+
+def admin_required(fn):
+    """Decorador de los endpoints de administración: JWT válido y rol admin."""
+
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if not require_admin():
+            return jsonify({"error": "No autorizado"}), 403
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def paginate_query(stmt, columna_id):
+    """Pagina una select() de columnas, ordenada por columna_id.
+
+    Con ?after_id= se usa paginación por clave (id > after_id LIMIT per_page),
+    sin COUNT(*) ni OFFSET; meta.next_after_id es None en la última página.
+    Sin él, paginación estándar por page/per_page.
+    Retorna (filas como dicts, meta).
+    """
     per_page = request.args.get("per_page", default=10, type=int)
     per_page = min(max(per_page, 1), 100)
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    return pagination
+    after_id = request.args.get("after_id", type=int)
+    if after_id is not None:
+        # Se pide una fila de más solo para saber si hay página siguiente
+        stmt = stmt.where(columna_id > after_id).order_by(columna_id)
+        filas = db.session.execute(stmt.limit(per_page + 1)).mappings().all()
+        hay_mas = len(filas) > per_page
+        filas = [dict(fila) for fila in filas[:per_page]]
+        meta = {
+            "per_page": per_page,
+            "next_after_id": filas[-1]["id"] if hay_mas else None,
+        }
+        return filas, meta
+
+    page = max(request.args.get("page", default=1, type=int), 1)
+    total = db.session.scalar(select(func.count()).select_from(stmt.subquery()))
+    offset = (page - 1) * per_page
+    filas = []
+    # Una página más allá del final no recorre la tabla con OFFSET
+    if offset < total:
+        stmt = stmt.order_by(columna_id).limit(per_page).offset(offset)
+        filas = [dict(fila) for fila in db.session.execute(stmt).mappings()]
+    meta = {
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": -(-total // per_page),
+    }
+    return filas, meta
+
+
+def leer_json_lote():
+    """Cuerpo JSON de una carga masiva; admite Content-Encoding: gzip.
+
+    Retorna None si el cuerpo no es JSON válido o si descomprimido supera
+    MAX_BYTES_LOTE.
+    """
+    if request.headers.get("Content-Encoding", "").lower() != "gzip":
+        return request.get_json(silent=True)
+    try:
+        descompresor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        cuerpo = descompresor.decompress(request.get_data(), MAX_BYTES_LOTE)
+        if descompresor.unconsumed_tail:
+            return None
+        return orjson.loads(cuerpo)
+    except (zlib.error, orjson.JSONDecodeError):
+        return None
 
 
-def build_meta(pagination):
-    return {
-        "page": pagination.page,
-        "per_page": pagination.per_page,
-        "total": pagination.total,
-        "pages": pagination.pages,
-    }
+def validar_datos(data, requeridos, opcionales=(), parcial=False):
+    """Valida un objeto JSON cuyos campos son de texto.
+
+    Los campos requeridos deben ser cadenas; los opcionales, cadenas o null.
+    Con parcial=True (actualizaciones) los requeridos pueden faltar.
+    Retorna el mensaje de error, o None si data es válido.
+    """
+    if not isinstance(data, dict):
+        return "Faltan datos requeridos"
+    if not parcial and not all(k in data for k in requeridos):
+        return "Faltan datos requeridos"
+    for k in requeridos:
+        if k in data and not isinstance(data[k], str):
+            return f"El campo '{k}' debe ser texto"
+    for k in opcionales:
+        if data.get(k) is not None and not isinstance(data[k], str):
+            return f"El campo '{k}' debe ser texto"
+    return None
+
+
+def crear_lote(
+    construir,
+    serializar,
+    clave,
+    requeridos=("nombre",),
+    opcionales=(),
+    preparar=None,
+    max_items=MAX_ITEMS_LOTE,
+):
+    """Crea en una sola transacción los elementos de {"items": [...]}.
+
+    Admite hasta max_items elementos; cada uno se valida con
+    validar_datos(requeridos, opcionales).
+    construir(data) devuelve la instancia del modelo, o un mensaje de error
+    si el elemento no se puede crear, y serializar(obj) su representación.
+    preparar(validos), si se indica, recibe antes los elementos válidos.
+    Retorna un resultado por elemento, en el mismo orden.
+    """
+    data = leer_json_lote()
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list) or len(items) > max_items:
+        return (
+            jsonify({"error": f"Se esperaba 'items' con hasta {max_items} elementos"}),
+            400,
+        )
+
+    errores = [validar_datos(data, requeridos, opcionales) for data in items]
+    if preparar:
+        preparar([data for data, error in zip(items, errores) if error is None])
+    instancias = [
+        construir(data) if error is None else error
+        for data, error in zip(items, errores)
+    ]
+    nuevos = [obj for obj in instancias if not isinstance(obj, str)]
+    db.session.add_all(nuevos)
+    db.session.commit()
+    # expire_on_commit=False: las instancias conservan sus valores (e ids)
+    # tras el commit y se serializan sin volver a consultarlas
+    resultados = [
+        {"error": obj} if isinstance(obj, str) else {clave: serializar(obj)}
+        for obj in instancias
+    ]
+
+    return (
+        jsonify({"creados": len(nuevos), "resultados": resultados}),
+        201 if nuevos else 400,
+    )
 
 
 # ========================================
@@ -122,17 +408,18 @@ def register():
     """Registrar un nuevo usuario"""
     data = request.get_json() or {}
 
-    if "username" not in data or "password" not in data:
-        return jsonify({"error": "Faltan datos requeridos"}), 400
+    error = validar_datos(data, ("username", "password"), ("rol",))
+    if error:
+        return jsonify({"error": error}), 400
 
-    if User.query.filter_by(username=data["username"]).first():
+    if buscar_usuario(data["username"]):
         return jsonify({"error": "El usuario ya existe"}), 400
 
     hashed = generate_password_hash(data["password"])
     nuevo_usuario = User(
         username=data["username"],
         password=hashed,
-        rol=data.get("rol", "paciente"),
+        rol=data.get("rol") or "paciente",
     )
     db.session.add(nuevo_usuario)
     db.session.commit()
@@ -152,19 +439,84 @@ def register():
     )
 
 
+@auth_bp.route("/auth/register/bulk", methods=["POST"])
+@admin_required
+def register_lote():
+    """Registrar varios usuarios en una sola transacción (requiere rol admin)
+
+    Admite hasta MAX_USUARIOS_LOTE usuarios por petición.
+    """
+    vistos = set()
+    hashes = {}
+
+    def preparar(validos):
+        # Una sola consulta IN para todos los usernames del lote
+        usernames = {data["username"] for data in validos}
+        vistos.clear()
+        vistos.update(
+            db.session.scalars(
+                select(User.username).where(User.username.in_(usernames))
+            )
+        )
+        # Solo se calcula el hash de la primera aparición de cada username
+        # nuevo, y una sola vez aunque el lote se repita; scrypt libera el
+        # GIL, así que se hace en paralelo
+        nuevos = {}
+        for data in validos:
+            username = data["username"]
+            if username not in vistos and username not in hashes:
+                nuevos.setdefault(username, data["password"])
+        for username, hashed in zip(
+            nuevos, _hash_executor.map(generate_password_hash, nuevos.values())
+        ):
+            hashes[username] = hashed
+
+    def construir(data):
+        username = data["username"]
+        if username in vistos:
+            return "El usuario ya existe"
+        vistos.add(username)
+        return User(
+            username=username,
+            password=hashes[username],
+            rol=data.get("rol") or "paciente",
+        )
+
+    # Si un registro concurrente usa alguno de los usernames entre la consulta
+    # y el commit, el lote se repite: la nueva consulta IN marca esa fila
+    for _ in range(2):
+        try:
+            return crear_lote(
+                construir,
+                lambda obj: {"id": obj.id, "username": obj.username, "rol": obj.rol},
+                "usuario",
+                requeridos=("username", "password"),
+                opcionales=("rol",),
+                preparar=preparar,
+                max_items=MAX_USUARIOS_LOTE,
+            )
+        except IntegrityError:
+            db.session.rollback()
+    return jsonify({"error": "El usuario ya existe"}), 400
+
+
 @auth_bp.route("/auth/login", methods=["POST"])
 def login():
     """Iniciar sesión y obtener token JWT"""
     data = request.get_json() or {}
 
-    if "username" not in data or "password" not in data:
-        return jsonify({"error": "Faltan datos requeridos"}), 400
+    error = validar_datos(data, ("username", "password"))
+    if error:
+        return jsonify({"error": error}), 400
 
-    usuario = User.query.filter_by(username=data["username"]).first()
+    usuario = buscar_usuario(data["username"])
     if not usuario or not check_password_hash(usuario.password, data["password"]):
         return jsonify({"error": "Credenciales inválidas"}), 401
 
-    token = create_access_token(identity=str(usuario.id))
+    token = create_access_token(
+        identity=str(usuario.id),
+        additional_claims={"username": usuario.username, "rol": usuario.rol},
+    )
 
     return (
         jsonify(
@@ -187,445 +539,185 @@ def login():
 # ========================================
 admin_bp = Blueprint("admin_bp", __name__)
 
-# -------- Pacientes ---------
-
-
-@admin_bp.route("/admin/pacientes", methods=["POST"])
-@jwt_required()
-def crear_paciente():
-    """Crear un nuevo paciente (requiere rol admin)"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    data = request.get_json() or {}
-    if "nombre" not in data:
-        return jsonify({"error": "Faltan datos requeridos"}), 400
-
-    nuevo_paciente = Patient(
-        nombre=data["nombre"],
-        telefono=data.get("telefono", ""),
-        estado=data.get("estado", "ACTIVO"),
-    )
-    db.session.add(nuevo_paciente)
-    db.session.commit()
 
-    return (
-        jsonify(
-            {
-                "mensaje": "Paciente creado exitosamente",
-                "paciente": {
-                    "id": nuevo_paciente.id,
-                    "nombre": nuevo_paciente.nombre,
-                    "telefono": nuevo_paciente.telefono,
-                    "estado": nuevo_paciente.estado,
-                },
-            }
-        ),
-        201,
-    )
-
-
-@admin_bp.route("/admin/pacientes", methods=["GET"])
-@jwt_required()
-def listar_pacientes():
-    """Listar pacientes con filtros y paginación (solo activos por defecto)"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    estado = request.args.get("estado", default="ACTIVO")
-    nombre = request.args.get("nombre")
-
-    query = Patient.query
-    if estado:
-        query = query.filter_by(estado=estado)
-    if nombre:
-        query = query.filter(Patient.nombre.ilike(f"%{nombre}%"))
-
-    pagination = paginate_query(query.order_by(Patient.id))
-    pacientes = [
-        {
-            "id": p.id,
-            "nombre": p.nombre,
-            "telefono": p.telefono,
-            "estado": p.estado,
+@admin_bp.after_request
+def agregar_etag(respuesta):
+    """ETag débil (hash del cuerpo) en los GET; 304 si el cliente ya lo tiene
+
+    Se calcula sobre el JSON sin comprimir: Flask-Compress actúa después y no
+    modifica los ETag débiles.
+    """
+    if request.method != "GET" or respuesta.status_code != 200 or respuesta.is_streamed:
+        return respuesta
+    etag = hashlib.blake2b(respuesta.get_data(), digest_size=16).hexdigest()
+    respuesta.set_etag(etag, weak=True)
+    respuesta.headers["Cache-Control"] = "private, max-age=0, must-revalidate"
+    return respuesta.make_conditional(request)
+
+
+# -------- Pacientes, doctores y centros ---------
+
+
+def registrar_crud(ruta, modelo, clave, plural, etiqueta, campo, filtros):
+    """Registra en admin_bp los endpoints de administración de una entidad.
+
+    Pacientes, doctores y centros solo se diferencian en el modelo, los
+    nombres de la respuesta y una columna propia (campo); filtros son las
+    columnas de texto por las que se puede filtrar el listado. Todos los
+    endpoints requieren rol admin.
+    """
+    campos = ("id", "nombre", campo, "estado")
+    editables = ("nombre", campo, "estado")
+    opcionales = (campo, "estado")
+    # select() base del listado: se construye una vez y cada filtro la copia
+    listado = select(*(getattr(modelo, c) for c in campos))
+    no_encontrado = f"{etiqueta} no encontrado"
+
+    def construir(data):
+        return modelo(
+            nombre=data["nombre"],
+            **{campo: data.get(campo, "")},
+            estado=data.get("estado", "ACTIVO"),
+        )
+
+    def serializar(obj):
+        return {c: getattr(obj, c) for c in campos}
+
+    def crear():
+        """Crear un elemento nuevo"""
+        data = request.get_json() or {}
+        error = validar_datos(data, ("nombre",), opcionales)
+        if error:
+            return jsonify({"error": error}), 400
+
+        nuevo = construir(data)
+        db.session.add(nuevo)
+        db.session.commit()
+
+        return (
+            jsonify(
+                {"mensaje": f"{etiqueta} creado exitosamente", clave: serializar(nuevo)}
+            ),
+            201,
+        )
+
+    def crear_lote_entidad():
+        """Crear varios elementos en una sola transacción"""
+        return crear_lote(construir, serializar, clave, opcionales=opcionales)
+
+    def listar():
+        """Listar con filtros y paginación (solo activos por defecto)"""
+        stmt = listado
+        estado = request.args.get("estado", default="ACTIVO")
+        if estado:
+            stmt = stmt.where(modelo.estado == estado)
+        minimo, maximo = LONGITUD_FILTRO
+        for filtro in filtros:
+            valor = request.args.get(filtro)
+            if not valor:
+                continue
+            if not minimo <= len(valor) <= maximo:
+                error = f"El filtro '{filtro}' admite de {minimo} a {maximo} caracteres"
+                return jsonify({"error": error}), 400
+            # autoescape: los % y _ del cliente se buscan de forma literal
+            stmt = stmt.where(getattr(modelo, filtro).icontains(valor, autoescape=True))
+
+        filas, meta = paginate_query(stmt, modelo.id)
+
+        return jsonify({plural: filas, "meta": meta}), 200
+
+    def obtener(obj_id):
+        """Obtener un elemento por ID"""
+        obj = db.session.get(modelo, obj_id)
+        if not obj:
+            return jsonify({"error": no_encontrado}), 404
+
+        return jsonify({clave: serializar(obj)}), 200
+
+    def actualizar(obj_id):
+        """Actualizar datos (soft delete si estado=INACTIVO)"""
+        obj = db.session.get(modelo, obj_id)
+        if not obj:
+            return jsonify({"error": no_encontrado}), 404
+
+        data = request.get_json() or {}
+        error = validar_datos(data, ("nombre",), opcionales, parcial=True)
+        if error:
+            return jsonify({"error": error}), 400
+
+        # Solo se escribe si algún campo cambia; un re-guardado sin cambios
+        # no abre transacción de escritura
+        cambios = {
+            c: data[c] for c in editables if c in data and data[c] != getattr(obj, c)
         }
-        for p in pagination.items
-    ]
-
-    return jsonify({"pacientes": pacientes, "meta": build_meta(pagination)}), 200
-
-
-@admin_bp.route("/admin/pacientes/<int:paciente_id>", methods=["GET"])
-@jwt_required()
-def obtener_paciente(paciente_id):
-    """Obtener un paciente específico por ID"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    paciente = Patient.query.get(paciente_id)
-    if not paciente:
-        return jsonify({"error": "Paciente no encontrado"}), 404
-
-    return (
-        jsonify(
-            {
-                "paciente": {
-                    "id": paciente.id,
-                    "nombre": paciente.nombre,
-                    "telefono": paciente.telefono,
-                    "estado": paciente.estado,
+        if cambios:
+            for c, valor in cambios.items():
+                setattr(obj, c, valor)
+            db.session.commit()
+
+        return (
+            jsonify(
+                {
+                    "mensaje": f"{etiqueta} actualizado exitosamente",
+                    clave: serializar(obj),
                 }
-            }
-        ),
-        200,
-    )
-
-
-@admin_bp.route("/admin/pacientes/<int:paciente_id>", methods=["PUT"])
-@jwt_required()
-def actualizar_paciente(paciente_id):
-    """Actualizar datos de un paciente (soft delete si estado=INACTIVO)"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    paciente = Patient.query.get(paciente_id)
-    if not paciente:
-        return jsonify({"error": "Paciente no encontrado"}), 404
-
-    data = request.get_json() or {}
-    paciente.nombre = data.get("nombre", paciente.nombre)
-    paciente.telefono = data.get("telefono", paciente.telefono)
-    paciente.estado = data.get("estado", paciente.estado)
-
-    db.session.commit()
-
-    return (
-        jsonify(
-            {
-                "mensaje": "Paciente actualizado exitosamente",
-                "paciente": {
-                    "id": paciente.id,
-                    "nombre": paciente.nombre,
-                    "telefono": paciente.telefono,
-                    "estado": paciente.estado,
-                },
-            }
-        ),
-        200,
-    )
-
-
-@admin_bp.route("/admin/pacientes/<int:paciente_id>", methods=["DELETE"])
-@jwt_required()
-def eliminar_paciente(paciente_id):
-    """Soft delete de paciente (estado=INACTIVO)"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    paciente = Patient.query.get(paciente_id)
-    if not paciente:
-        return jsonify({"error": "Paciente no encontrado"}), 404
-
-    paciente.estado = "INACTIVO"
-    db.session.commit()
-
-    return jsonify({"mensaje": "Paciente inactivado exitosamente"}), 200
-
-
-# -------- Doctores ---------
-
-
-@admin_bp.route("/admin/doctores", methods=["POST"])
-@jwt_required()
-def crear_doctor():
-    """Crear un nuevo doctor (requiere rol admin)"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    data = request.get_json() or {}
-    if "nombre" not in data:
-        return jsonify({"error": "Faltan datos requeridos"}), 400
-
-    nuevo_doctor = Doctor(
-        nombre=data["nombre"],
-        especialidad=data.get("especialidad", ""),
-        estado=data.get("estado", "ACTIVO"),
+            ),
+            200,
+        )
+
+    def eliminar(obj_id):
+        """Soft delete (estado=INACTIVO)"""
+        obj = db.session.get(modelo, obj_id)
+        if not obj:
+            return jsonify({"error": no_encontrado}), 404
+
+        if obj.estado != "INACTIVO":
+            obj.estado = "INACTIVO"
+            db.session.commit()
+
+        return jsonify({"mensaje": f"{etiqueta} inactivado exitosamente"}), 200
+
+    # Se conservan los nombres de endpoint de las vistas originales
+    detalle = f"{ruta}/<int:obj_id>"
+    reglas = (
+        (ruta, f"crear_{clave}", crear, "POST"),
+        (f"{ruta}/bulk", f"crear_{plural}_lote", crear_lote_entidad, "POST"),
+        (ruta, f"listar_{plural}", listar, "GET"),
+        (detalle, f"obtener_{clave}", obtener, "GET"),
+        (detalle, f"actualizar_{clave}", actualizar, "PUT"),
+        (detalle, f"eliminar_{clave}", eliminar, "DELETE"),
     )
-    db.session.add(nuevo_doctor)
-    db.session.commit()
-
-    return (
-        jsonify(
-            {
-                "mensaje": "Doctor creado exitosamente",
-                "doctor": {
-                    "id": nuevo_doctor.id,
-                    "nombre": nuevo_doctor.nombre,
-                    "especialidad": nuevo_doctor.especialidad,
-                    "estado": nuevo_doctor.estado,
-                },
-            }
-        ),
-        201,
-    )
-
-
-@admin_bp.route("/admin/doctores", methods=["GET"])
-@jwt_required()
-def listar_doctores():
-    """Listar doctores con filtros y paginación"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    estado = request.args.get("estado", default="ACTIVO")
-    nombre = request.args.get("nombre")
-    especialidad = request.args.get("especialidad")
-
-    query = Doctor.query
-    if estado:
-        query = query.filter_by(estado=estado)
-    if nombre:
-        query = query.filter(Doctor.nombre.ilike(f"%{nombre}%"))
-    if especialidad:
-        query = query.filter(Doctor.especialidad.ilike(f"%{especialidad}%"))
-
-    pagination = paginate_query(query.order_by(Doctor.id))
-    doctores = [
-        {
-            "id": d.id,
-            "nombre": d.nombre,
-            "especialidad": d.especialidad,
-            "estado": d.estado,
-        }
-        for d in pagination.items
-    ]
-
-    return jsonify({"doctores": doctores, "meta": build_meta(pagination)}), 200
-
-
-@admin_bp.route("/admin/doctores/<int:doctor_id>", methods=["GET"])
-@jwt_required()
-def obtener_doctor(doctor_id):
-    """Obtener un doctor específico por ID"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    doctor = Doctor.query.get(doctor_id)
-    if not doctor:
-        return jsonify({"error": "Doctor no encontrado"}), 404
-
-    return (
-        jsonify(
-            {
-                "doctor": {
-                    "id": doctor.id,
-                    "nombre": doctor.nombre,
-                    "especialidad": doctor.especialidad,
-                    "estado": doctor.estado,
-                }
-            }
-        ),
-        200,
-    )
-
-
-@admin_bp.route("/admin/doctores/<int:doctor_id>", methods=["PUT"])
-@jwt_required()
-def actualizar_doctor(doctor_id):
-    """Actualizar datos de un doctor (soft delete si estado=INACTIVO)"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    doctor = Doctor.query.get(doctor_id)
-    if not doctor:
-        return jsonify({"error": "Doctor no encontrado"}), 404
-
-    data = request.get_json() or {}
-    doctor.nombre = data.get("nombre", doctor.nombre)
-    doctor.especialidad = data.get("especialidad", doctor.especialidad)
-    doctor.estado = data.get("estado", doctor.estado)
-
-    db.session.commit()
-
-    return (
-        jsonify(
-            {
-                "mensaje": "Doctor actualizado exitosamente",
-                "doctor": {
-                    "id": doctor.id,
-                    "nombre": doctor.nombre,
-                    "especialidad": doctor.especialidad,
-                    "estado": doctor.estado,
-                },
-            }
-        ),
-        200,
-    )
-
-
-@admin_bp.route("/admin/doctores/<int:doctor_id>", methods=["DELETE"])
-@jwt_required()
-def eliminar_doctor(doctor_id):
-    """Soft delete de doctor (estado=INACTIVO)"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    doctor = Doctor.query.get(doctor_id)
-    if not doctor:
-        return jsonify({"error": "Doctor no encontrado"}), 404
-
-    doctor.estado = "INACTIVO"
-    db.session.commit()
-
-    return jsonify({"mensaje": "Doctor inactivado exitosamente"}), 200
-
-
-# -------- Centros ---------
-
-
-@admin_bp.route("/admin/centros", methods=["POST"])
-@jwt_required()
-def crear_centro():
-    """Crear un nuevo centro médico (requiere rol admin)"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    data = request.get_json() or {}
-    if "nombre" not in data:
-        return jsonify({"error": "Faltan datos requeridos"}), 400
-
-    nuevo_centro = Center(
-        nombre=data["nombre"],
-        direccion=data.get("direccion", ""),
-        estado=data.get("estado", "ACTIVO"),
-    )
-    db.session.add(nuevo_centro)
-    db.session.commit()
-
-    return (
-        jsonify(
-            {
-                "mensaje": "Centro creado exitosamente",
-                "centro": {
-                    "id": nuevo_centro.id,
-                    "nombre": nuevo_centro.nombre,
-                    "direccion": nuevo_centro.direccion,
-                    "estado": nuevo_centro.estado,
-                },
-            }
-        ),
-        201,
-    )
-
-
-@admin_bp.route("/admin/centros", methods=["GET"])
-@jwt_required()
-def listar_centros():
-    """Listar centros con filtros y paginación"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    estado = request.args.get("estado", default="ACTIVO")
-    nombre = request.args.get("nombre")
-    direccion = request.args.get("direccion")
-
-    query = Center.query
-    if estado:
-        query = query.filter_by(estado=estado)
-    if nombre:
-        query = query.filter(Center.nombre.ilike(f"%{nombre}%"))
-    if direccion:
-        query = query.filter(Center.direccion.ilike(f"%{direccion}%"))
-
-    pagination = paginate_query(query.order_by(Center.id))
-    centros = [
-        {
-            "id": c.id,
-            "nombre": c.nombre,
-            "direccion": c.direccion,
-            "estado": c.estado,
-        }
-        for c in pagination.items
-    ]
-
-    return jsonify({"centros": centros, "meta": build_meta(pagination)}), 200
-
-
-@admin_bp.route("/admin/centros/<int:centro_id>", methods=["GET"])
-@jwt_required()
-def obtener_centro(centro_id):
-    """Obtener un centro específico por ID"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    centro = Center.query.get(centro_id)
-    if not centro:
-        return jsonify({"error": "Centro no encontrado"}), 404
-
-    return (
-        jsonify(
-            {
-                "centro": {
-                    "id": centro.id,
-                    "nombre": centro.nombre,
-                    "direccion": centro.direccion,
-                    "estado": centro.estado,
-                }
-            }
-        ),
-        200,
-    )
-
-
-@admin_bp.route("/admin/centros/<int:centro_id>", methods=["PUT"])
-@jwt_required()
-def actualizar_centro(centro_id):
-    """Actualizar datos de un centro (soft delete si estado=INACTIVO)"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    centro = Center.query.get(centro_id)
-    if not centro:
-        return jsonify({"error": "Centro no encontrado"}), 404
-
-    data = request.get_json() or {}
-    centro.nombre = data.get("nombre", centro.nombre)
-    centro.direccion = data.get("direccion", centro.direccion)
-    centro.estado = data.get("estado", centro.estado)
-
-    db.session.commit()
-
-    return (
-        jsonify(
-            {
-                "mensaje": "Centro actualizado exitosamente",
-                "centro": {
-                    "id": centro.id,
-                    "nombre": centro.nombre,
-                    "direccion": centro.direccion,
-                    "estado": centro.estado,
-                },
-            }
-        ),
-        200,
-    )
-
-
-@admin_bp.route("/admin/centros/<int:centro_id>", methods=["DELETE"])
-@jwt_required()
-def eliminar_centro(centro_id):
-    """Soft delete de centro (estado=INACTIVO)"""
-    if not require_admin():
-        return jsonify({"error": "No autorizado"}), 403
-
-    centro = Center.query.get(centro_id)
-    if not centro:
-        return jsonify({"error": "Centro no encontrado"}), 404
-
-    centro.estado = "INACTIVO"
-    db.session.commit()
-
-    return jsonify({"mensaje": "Centro inactivado exitosamente"}), 200
+    for regla, endpoint, vista, metodo in reglas:
+        admin_bp.add_url_rule(regla, endpoint, admin_required(vista), methods=[metodo])
+
+
+registrar_crud(
+    "/admin/pacientes",
+    Patient,
+    "paciente",
+    "pacientes",
+    "Paciente",
+    "telefono",
+    ("nombre",),
+)
+registrar_crud(
+    "/admin/doctores",
+    Doctor,
+    "doctor",
+    "doctores",
+    "Doctor",
+    "especialidad",
+    ("nombre", "especialidad"),
+)
+registrar_crud(
+    "/admin/centros",
+    Center,
+    "centro",
+    "centros",
+    "Centro",
+    "direccion",
+    ("nombre", "direccion"),
+)
 
 
 # ========================================
@@ -638,44 +730,109 @@ verify_bp = Blueprint("verify_bp", __name__)
 @jwt_required()
 def verificar_paciente(paciente_id):
     """Verificar si existe un paciente (sin devolver datos completos)"""
-    paciente = Patient.query.filter_by(id=paciente_id, estado="ACTIVO").first()
-
-    if not paciente:
+    if id_activo(Patient, paciente_id) is None:
         return jsonify({"exists": False, "error": "Paciente no encontrado"}), 404
 
-    return jsonify({"exists": True, "id": paciente.id}), 200
+    return jsonify({"exists": True, "id": paciente_id}), 200
 
 
 @verify_bp.route("/verify/doctores/<int:doctor_id>", methods=["GET"])
 @jwt_required()
 def verificar_doctor(doctor_id):
     """Verificar si existe un doctor (sin devolver datos completos)"""
-    doctor = Doctor.query.filter_by(id=doctor_id, estado="ACTIVO").first()
-
-    if not doctor:
+    if id_activo(Doctor, doctor_id) is None:
         return jsonify({"exists": False, "error": "Doctor no encontrado"}), 404
 
-    return jsonify({"exists": True, "id": doctor.id}), 200
+    return jsonify({"exists": True, "id": doctor_id}), 200
 
 
 @verify_bp.route("/verify/centros/<int:centro_id>", methods=["GET"])
 @jwt_required()
 def verificar_centro(centro_id):
     """Verificar si existe un centro (sin devolver datos completos)"""
-    centro = Center.query.filter_by(id=centro_id, estado="ACTIVO").first()
-
-    if not centro:
+    if id_activo(Center, centro_id) is None:
         return jsonify({"exists": False, "error": "Centro no encontrado"}), 404
 
-    return jsonify({"exists": True, "id": centro.id}), 200
+    return jsonify({"exists": True, "id": centro_id}), 200
+
+
+@verify_bp.route("/verify/batch", methods=["POST"])
+@jwt_required()
+def verificar_lote():
+    """Verificar en una sola petición si existen paciente, doctor y/o centro
+
+    Recibe {"paciente": id, "doctor": id, "centro": id} (todas opcionales)
+    y devuelve el resultado de cada una en "resultados". Cada id puede ser
+    también una lista (hasta MAX_ITEMS_LOTE); su resultado es entonces una
+    lista, en el mismo orden, de {"id", "exists"}.
+    """
+    data = request.get_json() or {}
+    modelos = {
+        "paciente": (Patient, "Paciente no encontrado"),
+        "doctor": (Doctor, "Doctor no encontrado"),
+        "centro": (Center, "Centro no encontrado"),
+    }
+
+    if not isinstance(data, dict):
+        return jsonify({"error": "Se esperaba un objeto JSON"}), 400
+    for entidad in modelos:
+        if entidad not in data:
+            continue
+        ids = data[entidad] if isinstance(data[entidad], list) else [data[entidad]]
+        # type() y no isinstance(): bool es subclase de int
+        if len(ids) > MAX_ITEMS_LOTE or any(type(id_) is not int for id_ in ids):
+            error = f"El id de {entidad} debe ser un entero o una lista de enteros"
+            return jsonify({"error": error}), 400
+
+    resultados = {}
+    for entidad, (modelo, error) in modelos.items():
+        if entidad not in data:
+            continue
+        if isinstance(data[entidad], list):
+            activos = ids_activos(modelo, data[entidad])
+            resultados[entidad] = [
+                (
+                    {"id": id_, "exists": True}
+                    if id_ in activos
+                    else {"id": id_, "exists": False, "error": error}
+                )
+                for id_ in data[entidad]
+            ]
+            continue
+        id_ = id_activo(modelo, data[entidad])
+        if id_ is not None:
+            resultados[entidad] = {"exists": True, "id": id_}
+        else:
+            resultados[entidad] = {"exists": False, "error": error}
+
+    return jsonify({"resultados": resultados}), 200
 
 
 @verify_bp.route("/verify/token", methods=["GET"])
 @jwt_required()
 def verificar_token():
-    """Verificar que un token JWT sea válido"""
+    """Verificar que un token JWT sea válido
+
+    Los tokens emitidos por login llevan username y rol como claims (los
+    usuarios no se modifican ni se borran), así que solo se consulta la base
+    de datos para tokens que no los traen.
+    """
     user_id = get_jwt_identity()
-    usuario = User.query.get(int(user_id)) if user_id is not None else None
+    claims = get_jwt()
+    if "username" in claims and "rol" in claims:
+        return (
+            jsonify(
+                {
+                    "valid": True,
+                    "user_id": int(user_id),
+                    "username": claims["username"],
+                    "rol": claims["rol"],
+                }
+            ),
+            200,
+        )
+
+    usuario = db.session.get(User, int(user_id)) if user_id is not None else None
 
     if not usuario:
         return jsonify({"valid": False, "error": "Usuario no encontrado"}), 404
@@ -695,27 +852,29 @@ def verificar_token():
 # ========================================
 
 
+# Cuerpos constantes serializados una sola vez al importar el módulo
+_HEALTH_BODY = orjson.dumps(
+    {"service": "user_service", "status": "ok", "environment": "development"}
+)
+_ROOT_BODY = orjson.dumps(
+    {
+        "name": "OdontoCare - Servicio de Gestión de Usuarios",
+        "version": "1.0.0",
+        "endpoints": {"auth": "/auth", "admin": "/admin", "health": "/health"},
+    }
+)
+
+
 @app.route("/health")
 def health():
     """Endpoint de verificación de salud del servicio"""
-    return jsonify(
-        {"service": "user_service", "status": "ok", "environment": "development"}
-    ), 200
+    return Response(_HEALTH_BODY, status=200, mimetype="application/json")
 
 
 @app.route("/")
 def root():
     """Endpoint raíz con información del servicio"""
-    return (
-        jsonify(
-            {
-                "name": "OdontoCare - Servicio de Gestión de Usuarios",
-                "version": "1.0.0",
-                "endpoints": {"auth": "/auth", "admin": "/admin", "health": "/health"},
-            }
-        ),
-        200,
-    )
+    return Response(_ROOT_BODY, status=200, mimetype="application/json")
 
 
 # ========================================
@@ -730,6 +889,15 @@ app.register_blueprint(verify_bp)
 # Crear tablas de la base de datos
 with app.app_context():
     db.create_all()
-
+    # create_all solo crea los índices junto con la tabla: en una base de datos
+    # anterior a ellos se añaden aquí
+    for modelo in (Patient, Doctor, Center):
+        for indice in modelo.__table__.indexes:
+            indice.create(db.engine, checkfirst=True)
+    # Cerrar las conexiones abiertas antes de que gunicorn haga fork (--preload)
+    db.engine.dispose()
+
+# Solo para desarrollo local; en Docker se sirve con gunicorn (ver Dockerfile).
+# El modo debug se activa con FLASK_DEBUG=1.
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8000, debug=True)
+    app.run(host="0.0.0.0", port=8000)